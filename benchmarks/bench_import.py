@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#measures the cold import time of seadiver.model in fresh interpreters
+#
+#  python benchmarks/bench_import.py [--runs N] [--max-ms LIMIT]
+#
+#exits with status 1 when the median import time exceeds '--max-ms' or when a heavy optional module gets imported
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#modules that must never be pulled in by 'import seadiver.model'
+FORBIDDEN_MODULES = ["matplotlib", "scipy", "asyncio", "multiprocessing"]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import seadiver.model
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (FORBIDDEN_MODULES,)
+
+
+def measure(runs):
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+
+    #numpy import is included, it is the only required dependency
+    timings = []
+    loaded = set()
+
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, check=True)
+        probe = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(probe["seconds"] * 1000)
+        loaded.update(probe["loaded"])
+
+    return timings, sorted(loaded)
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="import-time benchmark for seadiver.model")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    timings, loaded = measure(args.runs)
+    median = statistics.median(timings)
+
+    print(f"import seadiver.model: median {median:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms ({args.runs} runs)")
+
+    failed = False
+
+    if loaded:
+        print("FAIL: optional modules imported: " + ", ".join(loaded))
+        failed = True
+
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"FAIL: median import time exceeds {args.max_ms:.1f} ms")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#training and inference throughput benchmarks
+#
+#  python benchmarks/run.py [--suite core] [--quick] [--output results.json]
+#  python benchmarks/run.py --compare baseline.json [--threshold 0.15]
+#
+#every core case records train steps/sec, predict rows/sec and the peak memory traced while training and predicting
+#prune cases record compiled-inference latency, rows/sec and weight bytes of pruned models, dense and sparse (requires scipy)
+#ensemble cases record the latency and rows/sec of averaging many models, looping 'predict' and as one stacked Ensemble
+#with '--compare', cases are matched by name against a stored result file and the run exits with status 1
+#when a throughput drops or a peak memory grows by more than '--threshold'
+#
+#import time is covered separately by benchmarks/bench_import.py
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seadiver import ensemble as en
+from seadiver import model as sd
+
+
+FEATURES = 128
+CLASSES = 10
+
+#train steps per timed call, so that per-session setup is amortized like in a real run
+STEPS = 10
+
+#metric name -> True when larger is better
+METRICS = {
+    "train_steps_per_sec": True,
+    "predict_rows_per_sec": True,
+    "train_peak_bytes": False,
+    "predict_peak_bytes": False,
+    "predict_latency_us": False,
+    "weight_bytes": False,
+}
+
+
+def make_data(rows, features=FEATURES, classes=CLASSES, seed=0):
+
+    random = np.random.RandomState(seed)
+
+    x = random.randn(rows, features)
+    t = np.eye(classes)[random.randint(0, classes, rows)]
+
+    return x, t
+
+def build(structure, activation, loss, strict, dtype="float64"):
+
+    initializer = "he" if activation == "relu" else "xabier"
+
+    return sd.ANN((1, FEATURES), structure, "softmax", activation=activation, loss=loss, initializer=initializer, strict=strict, dtype=dtype)
+
+def throughput(function, min_time, min_repeat=3):
+
+    #calls 'function' until 'min_time' seconds have passed, returns calls per second
+
+    function()
+
+    count = 0
+    start = time.perf_counter()
+
+    while True:
+        function()
+        count += 1
+        elapsed = time.perf_counter() - start
+        if count >= min_repeat and elapsed >= min_time:
+            return count / elapsed
+
+def peak_memory(function):
+
+    #numpy reports its buffers to tracemalloc, so this covers array allocations made by the call
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return peak
+
+
+#suites: each one yields (name, params, measure) where measure(min_time) returns a dict of metrics
+
+def core_cases(quick):
+
+    structures = [(64, 64, CLASSES), (256, 256, CLASSES)]
+    activations = ["sigmoid", "relu", "softmax", "identity"]
+    losses = ["cross_entropy", "mean_square"]
+    stricts = [False, True]
+    batch_sizes = [32, 256]
+
+    if quick:
+        structures = structures[:1]
+        batch_sizes = batch_sizes[:1]
+
+    for structure, activation, loss, strict, batch_size in itertools.product(structures, activations, losses, stricts, batch_sizes):
+
+        #'strict' only changes the softmax / cross entropy output layer
+        if strict and loss != "cross_entropy":
+            continue
+
+        params = {"structure": list(structure), "activation": activation, "loss": loss, "strict": strict, "batch_size": batch_size}
+        name = "core/{}/{}/{}/{}/b{}".format("x".join(map(str, structure)), activation, loss, "strict" if strict else "fast", batch_size)
+
+        yield name, params, core_measure(structure, activation, loss, strict, batch_size)
+
+def core_measure(structure, activation, loss, strict, batch_size):
+
+    def measure(min_time):
+
+        np.random.seed(0)
+        model = build(structure, activation, loss, strict)
+        x, t = make_data(batch_size)
+
+        train = lambda: model.train(x, t, 1e-4, iteration=STEPS, display=False, flush_log=False)
+        predict = lambda: model.predict(x)
+
+        return {
+            "train_steps_per_sec": throughput(train, min_time) * STEPS,
+            "predict_rows_per_sec": throughput(predict, min_time) * batch_size,
+            "train_peak_bytes": peak_memory(train),
+            "predict_peak_bytes": peak_memory(predict),
+        }
+
+    return measure
+
+def prune_cases(quick):
+
+    structures = [(1024, 1024, CLASSES), (4096, 4096, CLASSES)]
+    sparsities = [0.0, 0.8, 0.9, 0.95]
+    batch_sizes = [1, 256]
+
+    if quick:
+        structures = structures[:1]
+
+    for structure, sparsity, batch_size in itertools.product(structures, sparsities, batch_sizes):
+
+        #the unpruned model is the dense baseline the sparse plans are compared with
+        for sparse in ([False] if sparsity == 0.0 else [False, True]):
+
+            params = {"structure": list(structure), "sparsity": sparsity, "sparse": sparse, "batch_size": batch_size}
+            name = "prune/{}/s{}/{}/b{}".format("x".join(map(str, structure)), int(sparsity*100), "sparse" if sparse else "dense", batch_size)
+
+            yield name, params, prune_measure(structure, sparsity, sparse, batch_size)
+
+def prune_measure(structure, sparsity, sparse, batch_size):
+
+    def measure(min_time):
+
+        np.random.seed(0)
+        model = build(structure, "relu", "cross_entropy", False)
+        if sparsity > 0:
+            model.prune(sparsity)
+
+        x, _ = make_data(batch_size)
+        plan = model.compile_inference(batch_size, sparse=sparse)
+
+        calls_per_sec = throughput(lambda: plan.predict(x), min_time)
+
+        return {
+            "predict_rows_per_sec": calls_per_sec * batch_size,
+            "predict_latency_us": 1e6 / calls_per_sec,
+            "weight_bytes": plan.nbytes(),
+        }
+
+    return measure
+
+def ensemble_cases(quick):
+
+    structures = [(64, 64, CLASSES), (256, 256, CLASSES)]
+    member_counts = [10, 50]
+    batch_sizes = [1, 256]
+
+    if quick:
+        structures = structures[:1]
+        member_counts = member_counts[:1]
+
+    for structure, members, batch_size in itertools.product(structures, member_counts, batch_sizes):
+
+        #the loop over the members' own 'predict' is the baseline the stacked ensemble is compared with
+        for stacked in [False, True]:
+
+            params = {"structure": list(structure), "members": members, "stacked": stacked, "batch_size": batch_size}
+            name = "ensemble/{}/m{}/{}/b{}".format("x".join(map(str, structure)), members, "stacked" if stacked else "loop", batch_size)
+
+            yield name, params, ensemble_measure(structure, members, stacked, batch_size)
+
+def ensemble_measure(structure, members, stacked, batch_size):
+
+    def measure(min_time):
+
+        np.random.seed(0)
+        models = [build(structure, "relu", "cross_entropy", False) for _ in range(members)]
+        x, _ = make_data(batch_size)
+
+        if stacked:
+            ensemble = en.Ensemble(models, max_batch=batch_size)
+            out = np.empty((batch_size, CLASSES))
+            predict = lambda: ensemble.predict(x, out)
+        else:
+            predict = lambda: np.mean([model.predict(x) for model in models], axis=0)
+
+        calls_per_sec = throughput(predict, min_time)
+
+        return {
+            "predict_rows_per_sec": calls_per_sec * batch_size,
+            "predict_latency_us": 1e6 / calls_per_sec,
+        }
+
+    return measure
+
+SUITES = {
+    "core": core_cases,
+    "prune": prune_cases,
+    "ensemble": ensemble_cases,
+}
+
+
+def run(suites, quick, min_time, pattern=None):
+
+    results = []
+
+    for suite in suites:
+        for name, params, measure in SUITES[suite](quick):
+
+            if pattern is not None and pattern not in name:
+                continue
+
+            metrics = measure(min_time)
+            results.append({"name": name, "params": params, "metrics": metrics})
+
+            print(name.ljust(56) + "  ".join(f"{key}={format_metric(key, value)}" for key, value in metrics.items()), flush=True)
+
+    return {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+def format_metric(key, value):
+
+    if key.endswith("_bytes"):
+        return f"{value/2**20:.2f}MiB"
+
+    if key.endswith("_us"):
+        return f"{value:.1f}us"
+
+    return f"{value:.1f}"
+
+def compare(current, baseline, threshold):
+
+    #returns a list of regressions, each one a human readable line
+
+    baseline_results = {result["name"]: result["metrics"] for result in baseline["results"]}
+    regressions = []
+
+    for result in current["results"]:
+
+        if result["name"] not in baseline_results:
+            continue
+
+        for key, value in result["metrics"].items():
+
+            if key not in METRICS or key not in baseline_results[result["name"]]:
+                continue
+
+            reference = baseline_results[result["name"]][key]
+            if reference == 0:
+                continue
+
+            change = (value - reference) / reference
+
+            #throughput regresses when it drops, memory regresses when it grows
+            regressed = change < -threshold if METRICS[key] else change > threshold
+
+            if regressed:
+                regressions.append(f"{result['name']} {key}: {format_metric(key, reference)} -> {format_metric(key, value)} ({change*100:+.1f}%)")
+
+    return regressions
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="seadiver training and inference benchmarks")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES), help="suite to run, may be repeated (default: core)")
+    parser.add_argument("--quick", action="store_true", help="run a reduced matrix")
+    parser.add_argument("--filter", default=None, help="only run cases whose name contains this string")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent timing each metric")
+    parser.add_argument("--output", default=None, help="write results as json to this file")
+    parser.add_argument("--compare", default=None, help="baseline json file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change flagged as a regression")
+    args = parser.parse_args()
+
+    results = run(args.suite or ["core"], args.quick, args.min_time, args.filter)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=1)
+
+    if args.compare is not None:
+
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.threshold)
+
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold*100:.0f}%:")
+            for line in regressions:
+                print("  " + line)
+            return 1
+
+        print(f"\nno regressions beyond {args.threshold*100:.0f}%")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,18 @@
-import seadiver.model
\ No newline at end of file
+import importlib
+
+import seadiver.model
+import seadiver.dataset
+import seadiver.binary
+import seadiver.inference
+import seadiver.optimizer
+import seadiver.profiler
+
+#modules that need multiprocessing, threads or asyncio are imported on first access, e.g. 'seadiver.serving'
+LAZY_MODULES = ["parallel", "serving", "checkpoint", "sweep", "ensemble", "score"]
+
+def __getattr__(name):
+
+    if name in LAZY_MODULES:
+        return importlib.import_module("seadiver." + name)
+
+    raise AttributeError(f"module 'seadiver' has no attribute '{name}'")
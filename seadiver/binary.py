@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import json
+import struct
+
+
+#binary model format
+#
+#  magic (8 bytes) | version (uint32) | reserved (uint32) | header length (uint64)
+#  json header, padded to ALIGN bytes
+#  raw little-endian arrays, each one starting on an ALIGN byte boundary
+#
+#the header keeps the model fields as plain json and a table of every array's section, dtype, shape and offset
+
+MAGIC = b"SDVRBIN\x00"
+VERSION = 1
+ALIGN = 64
+
+_PREAMBLE = struct.Struct("<8sIIQ")
+
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+def _little_endian(array):
+
+    array = np.ascontiguousarray(array)
+
+    if array.dtype.byteorder == ">":
+        array = array.astype(array.dtype.newbyteorder("<"))
+
+    return array
+
+def is_binary(file):
+
+    try:
+        with open(file, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+def write(file, fields, sections):
+
+    #'fields' is a json-serializable dict, 'sections' maps a section name to a list of arrays
+
+    table = []
+    arrays = []
+
+    for name, section in sections.items():
+        for index, array in enumerate(section):
+            array = _little_endian(array)
+            #object arrays hold pointers, which cannot be read back
+            if array.dtype == object:
+                raise Exception(f"array {str(index)} of section '{name}' has dtype object and cannot be written")
+            arrays.append(array)
+            table.append({"section": name, "index": index, "dtype": array.dtype.str, "shape": list(array.shape), "offset": 0, "nbytes": array.nbytes})
+
+    #offsets depend on the header length and the header holds the offsets, so grow the estimate until it is stable
+    data_start = 0
+    while True:
+        offset = data_start
+        for entry in table:
+            entry["offset"] = offset
+            offset = _aligned(offset + entry["nbytes"])
+
+        header = json.dumps({"fields": fields, "arrays": table}).encode("utf-8")
+        required = _aligned(_PREAMBLE.size + len(header))
+
+        if required == data_start:
+            break
+        data_start = required
+
+    with open(file, "wb") as f:
+
+        f.write(_PREAMBLE.pack(MAGIC, VERSION, 0, len(header)))
+        f.write(header)
+        f.write(b"\x00" * (data_start - _PREAMBLE.size - len(header)))
+
+        for entry, array in zip(table, arrays):
+            f.write(b"\x00" * (entry["offset"] - f.tell()))
+            f.write(memoryview(array.reshape(-1)).cast("B"))
+
+    return
+
+def read(file, mmap=True):
+
+    #returns (fields, sections), arrays are copy-on-write views of a single memory map unless 'mmap' is False
+
+    with open(file, "rb") as f:
+
+        magic, version, _, header_length = _PREAMBLE.unpack(f.read(_PREAMBLE.size))
+
+        if magic != MAGIC:
+            raise Exception(f"'{file}' is not a seadiver binary model file")
+        if version > VERSION:
+            raise Exception(f"unsupported binary model version: {str(version)}")
+
+        header = json.loads(f.read(header_length).decode("utf-8"))
+
+        if not mmap:
+            f.seek(0)
+            buffer = bytearray(f.read())
+
+    if mmap:
+        buffer = np.memmap(file, dtype=np.uint8, mode="c")
+
+    sections = {}
+
+    for entry in header["arrays"]:
+
+        dtype = np.dtype(entry["dtype"])
+        count = int(np.prod(entry["shape"], dtype=np.int64))
+
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=entry["offset"]).reshape(entry["shape"])
+
+        section = sections.setdefault(entry["section"], [])
+        section.append(array)
+
+    return header["fields"], sections
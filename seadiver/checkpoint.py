@@ -0,0 +1,234 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import copy
+import os
+import queue
+import re
+import threading
+
+from seadiver import binary
+from seadiver import model as sd
+
+
+#background checkpointing
+#
+#a checkpoint copies the model's arrays into a snapshot kept by the Checkpointer, then a writer thread writes the
+#snapshot in the binary format ('export_binary') to a temporary file and renames it into place, so a checkpoint file
+#is either complete or absent
+#checkpoints are numbered in the order they are written to a directory, across sessions; the optimizer step a checkpoint
+#was taken at is kept in its header ('checkpoint_step'), since a new optimizer passed to 'train' counts from zero again
+#
+#    checkpointer = Checkpointer("checkpoints", every=500, keep=3)
+#    model.train(x, t, 0.01, batch_size=32, epochs=100, checkpoint=checkpointer)
+#    model = checkpoint.resume("checkpoints")
+
+
+class Checkpointer():
+
+    def __init__(self, directory, every=1000, keep=3, prefix="checkpoint", include=("essential", "optimizer")):
+
+        if every < 1:
+            raise Exception("'every' must be a positive integer")
+        if keep is not None and keep < 1:
+            raise Exception("'keep' must be a positive integer or None")
+        if not re.fullmatch(r"[\w\-]+", prefix):
+            raise Exception("'prefix' may only contain letters, digits, '_' and '-'")
+
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.prefix = prefix
+        self.include = include
+
+        #snapshot arrays, reused by every checkpoint whose shapes match
+        self.snapshot = {}
+
+        self.queue = queue.Queue()
+        self.thread = None
+        self.error = None
+
+        self.saved = []
+
+        os.makedirs(directory, exist_ok=True)
+
+        #numbers go on from the newest checkpoint of an earlier session, so 'prune' and 'resume' never mistake new checkpoints for old ones
+        self.sequence = last_sequence(directory, prefix)
+
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def step(self, model):
+
+        #called by 'train' after every update, steps are counted by the optimizer so the cadence survives a resume
+        if model.optimizer is not None and model.optimizer.step_count % self.every == 0:
+            self.save(model)
+
+        return
+
+    def save(self, model):
+
+        #copies the model's state and returns, the file is written in the background
+
+        #the snapshot is reused, so the previous write has to finish first
+        self.wait()
+
+        fields, sections = model.binary_contents(self.include)
+
+        fields = copy.deepcopy(fields)
+        fields["checkpoint_step"] = model.optimizer.step_count if model.optimizer is not None else None
+        snapshot = {}
+
+        for name, section in sections.items():
+
+            previous = self.snapshot.get(name)
+            if previous is None or len(previous) != len(section):
+                previous = [None]*len(section)
+
+            snapshot[name] = []
+            for array, buffer in zip(section, previous):
+                array = np.asarray(array)
+                if buffer is None or buffer.shape != array.shape or buffer.dtype != array.dtype:
+                    buffer = np.empty(array.shape, dtype=array.dtype)
+                np.copyto(buffer, array)
+                snapshot[name].append(buffer)
+
+        self.snapshot = snapshot
+
+        self.sequence += 1
+        file_name = f"{self.prefix}-{self.sequence:09d}.sdv"
+
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.write_loop, daemon=True)
+            self.thread.start()
+
+        self.queue.put((file_name, fields, snapshot))
+
+        return os.path.join(self.directory, file_name)
+
+    def write_loop(self):
+
+        while True:
+
+            item = self.queue.get()
+
+            try:
+                if item is None:
+                    return
+
+                file_name, fields, sections = item
+                path = os.path.join(self.directory, file_name)
+                temp_path = os.path.join(self.directory, "." + file_name + ".tmp")
+
+                binary.write(temp_path, fields, sections)
+                os.replace(temp_path, path)
+
+                self.saved.append(path)
+                self.prune()
+
+            except Exception as e:
+                self.error = e
+
+            finally:
+                self.queue.task_done()
+
+    def prune(self):
+
+        #removes the oldest checkpoints beyond 'keep', including those left by earlier sessions
+        if self.keep is None:
+            return
+
+        for path in list_checkpoints(self.directory, self.prefix)[:-self.keep]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        return
+
+    def wait(self):
+
+        #blocks until every queued checkpoint is on disk, and raises a failure of the writer thread
+        self.queue.join()
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise Exception("checkpoint could not be written: " + str(error))
+
+        return
+
+    def close(self):
+
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+
+        self.snapshot = {}
+
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise Exception("checkpoint could not be written: " + str(error))
+
+        return
+
+
+def numbered_checkpoints(directory, prefix="checkpoint"):
+
+    #(sequence number, path) of the checkpoint files in 'directory', oldest first
+
+    pattern = re.compile(re.escape(prefix) + r"-(\d+)\.sdv")
+    found = []
+
+    for file_name in os.listdir(directory):
+        match = pattern.fullmatch(file_name)
+        if match:
+            found.append((int(match.group(1)), os.path.join(directory, file_name)))
+
+    return sorted(found)
+
+def list_checkpoints(directory, prefix="checkpoint"):
+
+    #checkpoint files in 'directory', oldest first
+    return [path for _, path in numbered_checkpoints(directory, prefix)]
+
+def last_sequence(directory, prefix="checkpoint"):
+
+    #number of the newest checkpoint in 'directory', 0 if there is none
+    checkpoints = numbered_checkpoints(directory, prefix)
+
+    return checkpoints[-1][0] if len(checkpoints) > 0 else 0
+
+def latest(directory, prefix="checkpoint"):
+
+    #path of the newest checkpoint in 'directory', None if there is none
+
+    if not os.path.isdir(directory):
+        return None
+
+    checkpoints = list_checkpoints(directory, prefix)
+
+    if len(checkpoints) == 0:
+        return None
+
+    return checkpoints[-1]
+
+def resume(directory, prefix="checkpoint"):
+
+    #model and optimizer state of the newest checkpoint, 'train' continues from it
+    #arrays are read into memory rather than mapped, since the file may be removed by a later checkpoint
+
+    path = latest(directory, prefix)
+
+    if path is None:
+        raise Exception(f"no checkpoint found in '{directory}'")
+
+    return sd.make(path, mmap=False)
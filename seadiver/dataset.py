@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import os
+import sys
+
+
+def is_sparse(a):
+
+    #scipy is optional and never imported here, a scipy.sparse matrix can only exist once the caller has imported it
+    sparse = sys.modules.get("scipy.sparse")
+
+    return sparse is not None and sparse.issparse(a)
+
+
+class Dataset():
+
+    #a source of (x, t) rows that can live on disk, batches are handed out as zero-copy row slices
+
+    def __init__(self, x, t=None):
+
+        if not hasattr(x, "shape"):
+            x = np.asarray(x)
+        if t is not None and not hasattr(t, "shape"):
+            t = np.asarray(t)
+
+        if len(x.shape) != 2:
+            raise Exception("'x' must be a 2-dimensional array")
+
+        if t is not None and t.shape[0] != x.shape[0]:
+            raise Exception("'x' and 't' must have the same number of rows")
+
+        self.x = x
+        self.t = t
+
+        return
+
+    def __len__(self):
+        return self.x.shape[0]
+
+    def count_inputs(self, group=1):
+
+        #number of model inputs, where one input spans 'group' rows
+
+        if self.x.shape[0] % group != 0:
+            raise Exception("number of rows in the dataset must be a multiple of specified input size of the model object")
+
+        return self.x.shape[0] // group
+
+    def batches(self, batch_size, group=1, shuffle=False):
+
+        #yields (x, t) row slices of 'batch_size' inputs, each one a view on the underlying (memory-mapped) arrays
+        #shuffling permutes the order of the batches only, so every batch still touches a single contiguous range of pages
+
+        if batch_size < 1:
+            raise Exception("'batch_size' must be a positive integer")
+
+        n_inputs = self.count_inputs(group)
+        starts = np.arange(0, n_inputs, batch_size)
+
+        if shuffle:
+            starts = np.random.permutation(starts)
+
+        for start in starts:
+
+            row_start = int(start)*group
+            row_end = min(int(start)+batch_size, n_inputs)*group
+
+            if self.t is None:
+                yield self.x[row_start:row_end], None
+            else:
+                yield self.x[row_start:row_end], self.t[row_start:row_end]
+
+
+#util: create a dataset from files on disk
+
+def load(x_file, t_file=None):
+
+    #memory-maps '.npy' files, nothing is read until a batch is touched
+
+    x = np.load(x_file, mmap_mode="r")
+
+    if t_file is None:
+        t = None
+    else:
+        t = np.load(t_file, mmap_mode="r")
+
+    return Dataset(x, t)
+
+def load_raw(x_file, n_columns, dtype="float64", t_file=None, t_columns=None, t_dtype=None, offset=0):
+
+    #memory-maps headerless row-major binary files, the number of rows is derived from the file size
+
+    x = _map_raw(x_file, n_columns, dtype, offset)
+
+    if t_file is None:
+        t = None
+    else:
+        if t_columns is None:
+            raise Exception("'t_columns' must be specified along with 't_file'")
+        if t_dtype is None:
+            t_dtype = dtype
+        t = _map_raw(t_file, t_columns, t_dtype, offset)
+
+    return Dataset(x, t)
+
+def _map_raw(file, n_columns, dtype, offset):
+
+    row_bytes = np.dtype(dtype).itemsize * n_columns
+    data_bytes = os.path.getsize(file) - offset
+
+    if data_bytes % row_bytes != 0:
+        raise Exception(f"size of '{file}' is not a multiple of a row ({str(n_columns)} x {str(np.dtype(dtype))})")
+
+    return np.memmap(file, dtype=dtype, mode="r", offset=offset, shape=(data_bytes // row_bytes, n_columns))
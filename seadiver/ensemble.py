@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+from seadiver import inference
+from seadiver import model as sd
+
+
+#stacked ensembles
+#
+#members of the same architecture are evaluated together: the first layers of all members are concatenated into one
+#(features in, members * features out) matrix, so the shared input is multiplied once, and every later layer is one
+#batched np.matmul over (members, inputs, features) stacks
+#
+#    ensemble = seadiver.ensemble.from_files(["m1.sdv", "m2.sdv", "m3.sdv"], reduction="vote")
+#    y = ensemble.predict(x)
+
+
+REDUCTIONS = ["mean", "weighted", "vote"]
+
+
+class Ensemble(inference.InferencePlan):
+
+    #'mean' averages the members' outputs, 'weighted' averages them with 'weights', 'vote' returns the share of (weighted)
+    #votes each output received, one vote per member for its largest output
+    #like an InferencePlan an Ensemble is frozen, not thread-safe, and predicts up to 'max_batch' inputs per run
+
+    def __init__(self, models, weights=None, reduction="mean", max_batch=1024):
+
+        if max_batch < 1:
+            raise Exception("'max_batch' must be a positive integer")
+        if len(models) == 0:
+            raise Exception("an ensemble needs at least one model")
+        if reduction not in REDUCTIONS:
+            raise Exception("'reduction' must be one of " + str(REDUCTIONS))
+
+        first = models[0]
+
+        for member in models[1:]:
+            if tuple(member.input_shape) != tuple(first.input_shape) or list(member.activations) != list(first.activations):
+                raise Exception("members of an ensemble must have the same input shape and activations")
+            if [w.shape for w in member.w_layers] != [w.shape for w in first.w_layers]:
+                raise Exception("members of an ensemble must have the same structure")
+
+        for activation in first.activations:
+            if activation not in inference.inplace_activations:
+                raise Exception("unsupported activation function for inference: " + str(activation))
+
+        self.input_shape = tuple(first.input_shape)
+        self.group = self.input_shape[0]
+        self.max_batch = max_batch
+        self.max_rows = max_batch * self.group
+        self.members = len(models)
+        self.reduction = reduction
+
+        self.dtype = np.result_type(*[member.dtype for member in models])
+
+        #member weights are normalized to sum to one, 'mean' is the uniform case
+        if reduction == "weighted" and weights is None:
+            raise Exception("'weights' must be specified for the 'weighted' reduction")
+        if reduction == "mean" and weights is not None:
+            raise Exception("'weights' are only used by the 'weighted' and 'vote' reductions")
+
+        if weights is None:
+            weights = np.ones(self.members)
+
+        weights = np.asarray(weights, dtype=self.dtype)
+
+        if weights.shape != (self.members,):
+            raise Exception("'weights' must hold one weight per member")
+        if weights.sum() == 0:
+            raise Exception("'weights' must not sum to zero")
+
+        self.weights = weights / weights.sum()
+
+        #batch normalization is folded into every member before stacking
+        layers = [member.inference_layers() for member in models]
+
+        widths = [w.shape[1] for w in first.w_layers]
+
+        #(members, features in, features out) weights and (members, 1, features out) biases, scalar biases are broadcast
+        self.w_layers = [np.stack([np.asarray(w_layers[i], dtype=self.dtype) for w_layers, _ in layers]) for i in range(len(widths))]
+        self.b_layers = [np.stack([np.broadcast_to(np.asarray(b_layers[i], dtype=self.dtype), (widths[i],)) for _, b_layers in layers])[:, None, :] for i in range(len(widths))]
+
+        #the first layer's weights side by side, member after member
+        self.first_layer = np.ascontiguousarray(self.w_layers[0].transpose(1, 0, 2)).reshape(self.w_layers[0].shape[1], -1)
+
+        self.activations = list(first.activations)
+        self.kernels = [inference.inplace_activations[activation] for activation in self.activations]
+
+        #one flat (members * rows, features) buffer per layer, a run uses its leading rows as a contiguous (members, rows, features) stack
+        self.first_buffer = np.empty((self.max_rows, self.members * widths[0]), dtype=self.dtype)
+        self.buffers = [np.empty((self.members * self.max_rows, width), dtype=self.dtype) for width in widths]
+        self.reduce = np.empty((self.members * self.max_batch, 1), dtype=self.dtype)
+        self.output = np.empty((self.max_rows, widths[-1]), dtype=self.dtype)
+
+        self.sparse_layers = [None]*len(widths)
+
+        return
+
+    def nbytes(self):
+        return sum(w.nbytes for w in self.w_layers[1:]) + self.first_layer.nbytes + sum(b.nbytes for b in self.b_layers)
+
+    def clone(self):
+
+        ensemble = inference.InferencePlan.clone(self)
+        ensemble.first_buffer = np.empty_like(self.first_buffer)
+        ensemble.output = np.empty_like(self.output)
+
+        return ensemble
+
+    def run_members(self, x):
+
+        #returns a (members, rows, features out) view on the last layer's buffer, overwritten by the next call
+
+        x = self.cast(x)
+        rows = x.shape[0]
+
+        if rows % self.group != 0:
+            raise Exception("size of an input must be a multiple of specified input size of the model object")
+        if rows > self.max_rows:
+            raise Exception(f"input has more than {str(self.max_batch)} inputs, the ensemble was built for 'max_batch'={str(self.max_batch)}")
+
+        temp_x = None
+
+        for i, (w, b, kernel, buffer) in enumerate(zip(self.w_layers, self.b_layers, self.kernels, self.buffers)):
+
+            temp_out = buffer[:self.members * rows].reshape(self.members, rows, -1)
+
+            if i == 0:
+                #one product for all members, then the bias step also moves the result into member-major order
+                product = self.first_buffer[:rows]
+                if type(x) is np.ndarray:
+                    np.dot(x, self.first_layer, out=product)
+                else:
+                    np.copyto(product, x @ self.first_layer)
+                np.add(product.reshape(rows, self.members, -1).transpose(1, 0, 2), b, out=temp_out)
+            else:
+                np.matmul(temp_x, w, out=temp_out)
+                temp_out += b
+
+            #members are stacked row-wise, so per-input softmax still sees whole inputs
+            if kernel is not None:
+                kernel(temp_out.reshape(self.members * rows, -1), self.group, self.reduce)
+
+            temp_x = temp_out
+
+        return temp_x
+
+    def run(self, x):
+
+        #returns a view on the ensemble's output buffer, which is overwritten by the next call
+
+        stack = self.run_members(x)
+        rows = stack.shape[1]
+        out = self.output[:rows]
+
+        if self.reduction == "vote":
+            #one vote per member and input, an input spans 'group' rows as it does for softmax
+            n_inputs = rows // self.group
+            votes = out.reshape(n_inputs, -1)
+            votes.fill(0)
+            np.add.at(votes, (np.arange(n_inputs)[None, :], np.argmax(stack.reshape(self.members, n_inputs, -1), axis=2)), self.weights[:, None])
+        else:
+            np.dot(self.weights, stack.reshape(self.members, -1), out=out.reshape(-1))
+
+        return out
+
+
+def from_files(paths, weights=None, reduction="mean", max_batch=1024):
+
+    #an ensemble of the models saved at 'paths' (json or binary), their weights are copied into the stacks
+    models = [sd.make(path, mmap=False) for path in paths]
+
+    return Ensemble(models, weights, reduction, max_batch)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import copy
+
+from seadiver.dataset import is_sparse
+
+#in-place activation kernels, 'v' is a C-contiguous (rows, features) buffer and 'reduce' a (rows, 1) scratch buffer
+
+def sigmoid_inplace(v, group, reduce):
+    np.negative(v, out=v)
+    np.exp(v, out=v)
+    v += 1
+    np.reciprocal(v, out=v)
+    return
+
+def relu_inplace(v, group, reduce):
+    np.maximum(v, 0, out=v)
+    return
+
+def softmax_inplace(v, group, reduce):
+
+    #one softmax per input, where one input spans 'group' rows
+    temp_v = v.reshape(v.shape[0] // group, -1)
+    temp_reduce = reduce[:temp_v.shape[0]]
+
+    np.max(temp_v, axis=1, keepdims=True, out=temp_reduce)
+    temp_v -= temp_reduce
+    np.exp(temp_v, out=temp_v)
+    np.sum(temp_v, axis=1, keepdims=True, out=temp_reduce)
+    temp_v /= temp_reduce
+    return
+
+inplace_activations = {"sigmoid": sigmoid_inplace, "relu": relu_inplace, "softmax": softmax_inplace, "identity": None}
+
+
+class InferencePlan():
+
+    #a frozen, inference-only copy of a model
+    #activation dispatch is resolved once and every layer writes into a buffer preallocated for 'max_batch' inputs
+    #an InferencePlan is not thread-safe: concurrent callers must use one plan each, 'clone' makes one without copying the weights
+    #
+    #with 'sparse', layers with less than 'max_density' nonzero weights are stored in CSR and run as sparse products (requires scipy)
+
+    def __init__(self, input_shape, w_layers, b_layers, activations, max_batch=1024, sparse=False, max_density=0.5):
+
+        if max_batch < 1:
+            raise Exception("'max_batch' must be a positive integer")
+
+        for activation in activations:
+            if activation not in inplace_activations:
+                raise Exception("unsupported activation function for inference: " + str(activation))
+
+        self.input_shape = tuple(input_shape)
+        self.group = self.input_shape[0]
+        self.max_batch = max_batch
+        self.max_rows = max_batch * self.group
+
+        self.dtype = np.result_type(*w_layers)
+
+        self.w_layers = [np.array(w, dtype=self.dtype, order="C") for w in w_layers]
+
+        #sparse layers are kept transposed, (features out, features in) in CSR, so a batch is multiplied as w.T @ x.T
+        self.sparse_layers = [None]*len(self.w_layers)
+
+        if sparse:
+
+            try:
+                import scipy.sparse
+            except ImportError:
+                raise Exception("sparse inference requires scipy")
+
+            for i, w in enumerate(self.w_layers):
+                if np.count_nonzero(w) < max_density * w.size:
+                    self.sparse_layers[i] = scipy.sparse.csr_matrix(w.T)
+
+        #biases are scalars, or vectors once batch normalization is folded in
+        self.b_layers = [np.asarray(b, dtype=self.dtype) for b in b_layers]
+        self.activations = list(activations)
+
+        self.kernels = [inplace_activations[activation] for activation in self.activations]
+
+        self.buffers = [np.empty((self.max_rows, w.shape[1]), dtype=self.dtype) for w in self.w_layers]
+        self.reduce = np.empty((self.max_batch, 1), dtype=self.dtype)
+
+        #dense copies of sparse layers are not needed once the CSR form exists
+        for i, sparse_w in enumerate(self.sparse_layers):
+            if sparse_w is not None:
+                self.w_layers[i] = None
+
+        return
+
+    def nbytes(self):
+
+        #bytes held by the weights, CSR layers count their values and both index arrays
+        total = 0
+
+        for w, sparse_w in zip(self.w_layers, self.sparse_layers):
+            if sparse_w is None:
+                total += w.nbytes
+            else:
+                total += sparse_w.data.nbytes + sparse_w.indices.nbytes + sparse_w.indptr.nbytes
+
+        return total
+
+    def clone(self):
+
+        #a plan sharing this plan's weights, with buffers of its own
+        plan = copy.copy(self)
+        plan.buffers = [np.empty_like(buffer) for buffer in self.buffers]
+        plan.reduce = np.empty_like(self.reduce)
+
+        return plan
+
+    def run(self, x):
+
+        #returns a view on the plan's output buffer, which is overwritten by the next call
+
+        x = self.cast(x)
+        rows = x.shape[0]
+
+        if rows % self.group != 0:
+            raise Exception("size of an input must be a multiple of specified input size of the model object")
+        if rows > self.max_rows:
+            raise Exception(f"input has more than {str(self.max_batch)} inputs, the plan was compiled for 'max_batch'={str(self.max_batch)}")
+
+        temp_x = x
+
+        for w, sparse_w, b, kernel, buffer in zip(self.w_layers, self.sparse_layers, self.b_layers, self.kernels, self.buffers):
+
+            temp_out = buffer[:rows]
+
+            if sparse_w is not None:
+                product = sparse_w @ temp_x.T
+                if type(temp_x) is not np.ndarray:
+                    #a sparse input times sparse weights stays sparse
+                    product = product.toarray()
+                np.copyto(temp_out, product.T)
+            elif type(temp_x) is np.ndarray:
+                np.dot(temp_x, w, out=temp_out)
+            else:
+                #sparse inputs, only the first layer sees them
+                np.copyto(temp_out, temp_x @ w)
+            temp_out += b
+
+            if kernel is not None:
+                kernel(temp_out, self.group, self.reduce)
+
+            temp_x = temp_out
+
+        return temp_x
+
+    def predict(self, x, out=None):
+
+        #inputs are converted to the plan's dtype once, larger inputs are processed 'max_batch' inputs at a time
+
+        x = self.cast(x)
+
+        if x.shape[0] % self.group != 0:
+            raise Exception("size of an input must be a multiple of specified input size of the model object")
+
+        if out is None:
+            out = np.empty((x.shape[0], self.buffers[-1].shape[1]), dtype=self.dtype)
+
+        for start in range(0, x.shape[0], self.max_rows):
+            out[start:start+self.max_rows] = self.run(x[start:start+self.max_rows])
+
+        return out
+
+    def __call__(self, x, out=None):
+        return self.predict(x, out)
+
+    def cast(self, x):
+
+        #scipy.sparse inputs are kept sparse in CSR layout, everything else becomes a dense array
+        if is_sparse(x):
+            x = x.tocsr()
+            if x.dtype != self.dtype:
+                x = x.astype(self.dtype)
+            return x
+
+        return np.asarray(x, dtype=self.dtype)
+
+
+class QuantizedPlan(InferencePlan):
+
+    #an InferencePlan on int8 weights, built by 'ANN.quantize'
+    #
+    #every layer input is quantized to int8 with a scale calibrated on sample inputs, weights with one scale per layer or per
+    #output column, so a layer is  y = (x_q @ w_q) * (x_scale * w_scale) + b  with the dequantization folded into the bias step
+    #
+    #numpy has no int8 matrix product, integer products would run ~100x slower than BLAS, so the int8 values are held in
+    #float32 and multiplied by BLAS: sums of int8 products are exact in float32 up to 2**24, layers with more than
+    #1040 input features accumulate in float64 instead, so every result equals the int32 accumulation
+    #in memory the plan's weights are therefore half the size of float64 ones (the same size for layers held in float64),
+    #the 1 byte per weight int8 form is what 'export' and 'export_binary' write
+
+    def __init__(self, input_shape, q_layers, w_scales, x_scales, b_layers, activations, max_batch=1024):
+
+        if max_batch < 1:
+            raise Exception("'max_batch' must be a positive integer")
+
+        for activation in activations:
+            if activation not in inplace_activations:
+                raise Exception("unsupported activation function for inference: " + str(activation))
+
+        self.input_shape = tuple(input_shape)
+        self.group = self.input_shape[0]
+        self.max_batch = max_batch
+        self.max_rows = max_batch * self.group
+
+        #float32 holds every sum of up to 2**24 // 127**2 products of int8 values exactly
+        exact = all(q.shape[0] * 127 * 127 < 2**24 for q in q_layers)
+        self.dtype = np.dtype("float32") if exact else np.dtype("float64")
+
+        self.w_layers = [np.array(q, dtype=self.dtype, order="C") for q in q_layers]
+        self.w_scales = [np.array(scale, dtype=np.float64).reshape(-1) for scale in w_scales]
+        self.x_scales = [float(scale) for scale in x_scales]
+        self.b_layers = [np.asarray(b, dtype=self.dtype) for b in b_layers]
+        self.activations = list(activations)
+
+        #dequantization multiplier of every output column
+        self.multipliers = [(x_scale * w_scale).astype(self.dtype) for x_scale, w_scale in zip(self.x_scales, self.w_scales)]
+
+        self.kernels = [inplace_activations[activation] for activation in self.activations]
+
+        self.quantized_inputs = [np.empty((self.max_rows, w.shape[0]), dtype=self.dtype) for w in self.w_layers]
+        self.buffers = [np.empty((self.max_rows, w.shape[1]), dtype=self.dtype) for w in self.w_layers]
+        self.reduce = np.empty((self.max_batch, 1), dtype=self.dtype)
+
+        self.sparse_layers = [None]*len(self.w_layers)
+
+        #filled by 'ANN.quantize' with a comparison against the float model
+        self.accuracy = None
+
+        return
+
+    def q_layers(self):
+
+        #the int8 weights
+        return [w.astype(np.int8) for w in self.w_layers]
+
+    def dequantize(self):
+
+        #float weights as the quantized model sees them
+        return [w.astype(np.float64) * scale for w, scale in zip(self.w_layers, self.w_scales)]
+
+    def nbytes(self):
+
+        #bytes held in memory by the weights, as float32 (or float64) values, and their scales
+        return sum(w.nbytes + scale.nbytes for w, scale in zip(self.w_layers, self.w_scales))
+
+    def clone(self):
+
+        plan = InferencePlan.clone(self)
+        plan.quantized_inputs = [np.empty_like(buffer) for buffer in self.quantized_inputs]
+
+        return plan
+
+    def state(self):
+
+        #(meta, arrays): json-serializable settings and the int8 weights with their scales and biases
+        meta = {"x_scales": self.x_scales, "max_batch": self.max_batch}
+
+        return meta, {"w_layers": self.q_layers(), "w_scales": self.w_scales, "b_layers": [np.array(b, dtype=np.float64).reshape(-1) for b in self.b_layers]}
+
+    def run(self, x):
+
+        #returns a view on the plan's output buffer, which is overwritten by the next call
+
+        x = self.cast(x)
+        if type(x) is not np.ndarray:
+            x = x.toarray()
+
+        rows = x.shape[0]
+
+        if rows % self.group != 0:
+            raise Exception("size of an input must be a multiple of specified input size of the model object")
+        if rows > self.max_rows:
+            raise Exception(f"input has more than {str(self.max_batch)} inputs, the plan was compiled for 'max_batch'={str(self.max_batch)}")
+
+        temp_x = x
+
+        for w, x_scale, multiplier, b, kernel, quantized, buffer in zip(self.w_layers, self.x_scales, self.multipliers, self.b_layers, self.kernels, self.quantized_inputs, self.buffers):
+
+            temp_q = quantized[:rows]
+            temp_out = buffer[:rows]
+
+            #quantize the layer input: round(x / scale) clipped to the int8 range
+            np.multiply(temp_x, 1 / x_scale, out=temp_q)
+            np.rint(temp_q, out=temp_q)
+            np.clip(temp_q, -127, 127, out=temp_q)
+
+            np.dot(temp_q, w, out=temp_out)
+            temp_out *= multiplier
+            temp_out += b
+
+            if kernel is not None:
+                kernel(temp_out, self.group, self.reduce)
+
+            temp_x = temp_out
+
+        return temp_x
+
+    def report(self, x, reference):
+
+        #compares the plan's outputs on 'x' with 'reference', the float model's outputs on the same inputs
+
+        y = self.predict(x)
+        reference = np.asarray(reference, dtype=np.float64)
+        error = np.abs(y - reference)
+
+        report = {
+            "max_abs_error": float(np.max(error)),
+            "mean_abs_error": float(np.mean(error)),
+            "relative_error": float(np.linalg.norm(error) / max(np.linalg.norm(reference), np.finfo(np.float64).tiny)),
+        }
+
+        #share of inputs whose highest output is the same, an input spans 'group' rows
+        if reference.size // (reference.shape[0] // self.group) > 1:
+            n_inputs = reference.shape[0] // self.group
+            report["argmax_agreement"] = float(np.mean(np.argmax(y.reshape(n_inputs, -1), axis=1) == np.argmax(reference.reshape(n_inputs, -1), axis=1)))
+
+        return report
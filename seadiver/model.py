@@ -3,17 +3,22 @@
 
 import numpy as np
 
-import copy
+import base64
 import time
 import json
+import itertools
+import os
 
-import matplotlib as mpl
-import matplotlib.pyplot as plt
+from seadiver.dataset import Dataset, is_sparse
+from seadiver import binary
+from seadiver import inference
+from seadiver import optimizer as optim
+from seadiver import profiler as prof
 
 
 class ANN():
     
-    def __init__(self, input_shape, structure, output, activation= "sigmoid", loss = "auto", initializer = "auto", strict=False, delta=1e-7):
+    def __init__(self, input_shape, structure, output, activation= "sigmoid", loss = "auto", initializer = "auto", strict=False, delta=1e-7, dtype="float64", batch_norm=False, bn_momentum=0.9, bn_epsilon=1e-5):
         
         #describes compatible parameters
     
@@ -34,6 +39,7 @@ class ANN():
         self.initializer = None
         self.output= None
         self.loss = None
+        self.dtype = None
         
         #fields for temporal use and calculation
         
@@ -43,11 +49,41 @@ class ANN():
         self.fan_ins = []
         self.fan_outs = []
         
+        #int8 predictor built by 'quantize', dropped once the model is trained again
+        self.quantized = None
+        
+        #pruning masks, one boolean array per weight matrix (True where a weight is kept), None when the model is not pruned
+        self.masks = None
+        
+        #layers per recomputed segment of the latest forward, None when every activation is kept
+        self.recompute_interval = None
+        
         self.error_log = []
         
+        #(step, validation error) of the latest train session and the step whose weights were kept
+        self.validation_log = []
+        self.best_step = None
+        
+        #optimizer of the latest train session, kept so that training can be resumed
+        self.optimizer = None
+        
+        #preallocated training buffers, keyed by the number of rows in a batch
+        self.workspaces = {}
+        
+        #timing hooks, see 'profile'
+        self.profiler = None
+        
         
         #initialize fields if given parameters are valid
         
+        try:
+            self.dtype = np.dtype(dtype)
+        except TypeError:
+            raise Exception("invalid dtype: " + str(dtype))
+        
+        if not np.issubdtype(self.dtype, np.floating):
+            raise Exception("dtype must be a floating point type, e.g. 'float32' or 'float64'")
+        
         if initializer not in self.compat_initializers:
             raise Exception("invalid initialzier name")
         else:
@@ -189,6 +225,13 @@ class ANN():
             self.initializer = "xabier"
             print("Initializer set to 'xabier'")
         
+        #every parameter follows the model's dtype from here on
+        self.w_layers = [w.astype(self.dtype, copy=False) for w in self.w_layers]
+        self.b_layers = [self.dtype.type(b) for b in self.b_layers]
+        
+        #batch normalization parameters, running statistics and their gradients
+        self.init_batch_norm(batch_norm, bn_momentum, bn_epsilon)
+        
         return
     
     def describe(self):
@@ -199,7 +242,9 @@ class ANN():
         print("Actiavation: " + str(self.activations))
         print("Output Function: " + str(self.output))
         print("Loss Function: " + str(self.loss))
-        print("Initializer: " + str(self.initializer) + "\n")
+        print("Initializer: " + str(self.initializer))
+        print("Dtype: " + str(self.dtype))
+        print("Batch Normalization: " + str(self.batch_norm) + "\n")
         
         for i in range(len(self.w_layers)):
             print("Layer " + str(i+1) + "\n")
@@ -219,65 +264,59 @@ class ANN():
         return
 
     
-    def forward(self, x, t, display=False):
+    def forward(self, x, t, display=False, workspace=None, recompute=None):
+        
+        x = self.cast(x)
+        t = self.cast(t)
         
-        if np.asmatrix(x).shape[0] % self.input_shape[0] != 0:
+        profiler = self.profiler
+        
+        if self.count_rows(x) % self.input_shape[0] != 0:
             raise Exception("size of a mini-batch must be a multiple of specified input size of the model object")
         
-        batch_size = int(np.asmatrix(x).shape[0]/self.input_shape[0])
+        batch_size = int(self.count_rows(x)/self.input_shape[0])
         
         if display:
             print("batch_size: " + str(batch_size) +"\n")
 
-        # prepare memory lists for backward propagation
-                
-        self.fan_ins = []
-        self.fan_outs = []
+        # prepare memory lists for backward propagation, a workspace provides them preallocated
         
-        self.fan_ins.append(x)
+        if workspace is None:
+            self.fan_ins = [None]*(len(self.w_layers)+1)
+            self.fan_outs = [None]*len(self.w_layers)
+        else:
+            self.fan_ins = workspace.fan_ins
+            self.fan_outs = workspace.fan_outs
+        
+        #with recomputation only every k-th layer input is kept, backward rebuilds the layers in between
+        self.recompute_interval = self.get_recompute_interval(recompute)
+        
+        if self.recompute_interval is not None and workspace is not None:
+            raise Exception("'recompute' keeps fewer buffers than a workspace holds, they cannot be used together")
+        
+        self.fan_ins[0] = x
         
         temp_x = x
         
         for i in range(len(self.w_layers)): #affine and activation
             
-            temp_affined = self.affine_forward(temp_x, self.w_layers[i], self.b_layers[i])
-            
-            #batch normalization
-            #if batch_normalization:
-             #   temp_affined = 10
+            #normalized layers write the affine step to a scratch buffer and the normalized result to 'fan_outs'
+            if workspace is None:
+                affine_out, activation_out, norm_out, normalized_out = None, None, None, None
+            elif self.batch_norm[i]:
+                affine_out, activation_out = workspace.pre_norms[i], workspace.activation_outs[i]
+                norm_out, normalized_out = workspace.fan_outs[i], workspace.normalized[i]
+            else:
+                affine_out, activation_out = workspace.fan_outs[i], workspace.activation_outs[i]
+                norm_out, normalized_out = None, None
             
-            self.fan_outs.append(temp_affined)
+            temp_affined, temp_activated = self.layer_forward(i, temp_x, batch_size, affine_out, activation_out, display, norm_out=norm_out, normalized_out=normalized_out)
             
-            if self.activations[i] == "sigmoid":
-                temp_activated = self.sigmoid_forward(temp_affined)  # see here to check gradient loss!
-                self.fan_ins.append(temp_activated)
-                
-                if display:
-                    print("sigmoid forward " + str(temp_activated.shape))
-                    
-            elif self.activations[i] == "relu":
-                temp_activated = self.relu_forward(temp_affined)  # see here to check gradient loss!
-                self.fan_ins.append(temp_activated)
-                
-                if display:
-                    print("relu forward " + str(temp_activated.shape))
-                    
-            elif self.activations[i] == "softmax":
-                temp_activated = self.softmax_forward(temp_affined, batch_size)  # see here to check gradient loss!
-                self.fan_ins.append(temp_activated)
-                
-                if display:
-                    print("softmax forward " + str(temp_activated.shape))
-                    
-            elif self.activations[i] == "identity":
-                temp_activated = self.identity_forward(temp_affined)  # see here to check gradient loss!
-                self.fan_ins.append(temp_activated)
-                
-                if display:
-                    print("identity forward " + str(temp_activated.shape))
-                    
-            else:
-                raise Exception("Layer" + str(i+1) + ": " + "activation not successful")
+            if self.recompute_interval is None:
+                self.fan_outs[i] = temp_affined
+                self.fan_ins[i+1] = temp_activated
+            elif (i+1) % self.recompute_interval == 0 or i+1 == len(self.w_layers):
+                self.fan_ins[i+1] = temp_activated
 
             temp_x = temp_activated
             
@@ -288,6 +327,9 @@ class ANN():
         
         #loss calculation
         
+        if profiler is not None:
+            section = profiler.start()
+        
         if self.loss == "cross_entropy":
             error = self.cross_entropy_forward(network_out, t, batch_size)
             
@@ -297,6 +339,9 @@ class ANN():
         else:
             raise Exception("Loss function not successfull")
         
+        if profiler is not None:
+            profiler.stop("loss", None, section)
+        
         if display:
         
             print("Output: \n") 
@@ -308,21 +353,139 @@ class ANN():
         return network_out, error, batch_size
     
     
-    def backward(self, y, t, batch_size, display = False):
+    def layer_forward(self, i, x, batch_size, affine_out=None, activation_out=None, display=False, training=True, update_stats=True, norm_out=None, normalized_out=None):
         
-        #prepare gradient lists
+        #affine, batch normalization and activation of layer 'i', returns (pre-activation, activation)
+        #out of training, normalization is folded into the affine step (see 'inference_layers')
         
-        self.w_gradients = []
-        self.b_gradients = []
+        profiler = self.profiler
+        
+        if training:
+            w, b = self.w_layers[i], self.b_layers[i]
+        else:
+            w_layers, b_layers = self.inference_layers()
+            w, b = w_layers[i], b_layers[i]
+        
+        if profiler is not None:
+            section = profiler.start()
+        
+        temp_affined = self.affine_forward(x, w, b, out=affine_out)
+        
+        if profiler is not None:
+            profiler.stop("forward", i, section)
+        
+        #batch normalization
+        if training and self.batch_norm[i]:
+            
+            if profiler is not None:
+                section = profiler.start()
+            
+            temp_affined = self.batch_normalize_forward(i, temp_affined, update_stats, out=norm_out, normalized_out=normalized_out)
+            
+            if profiler is not None:
+                profiler.stop("batch_norm", i, section)
+            
+            if display:
+                print("batch normalization forward " + str(temp_affined.shape))
+        
+        if profiler is not None:
+            section = profiler.start()
+        
+        if self.activations[i] == "sigmoid":
+            temp_activated = self.sigmoid_forward(temp_affined, out=activation_out)  # see here to check gradient loss!
+            
+            if display:
+                print("sigmoid forward " + str(temp_activated.shape))
+                
+        elif self.activations[i] == "relu":
+            temp_activated = self.relu_forward(temp_affined, out=activation_out)  # see here to check gradient loss!
+            
+            if display:
+                print("relu forward " + str(temp_activated.shape))
+                
+        elif self.activations[i] == "softmax":
+            temp_activated = self.softmax_forward(temp_affined, batch_size, out=activation_out)  # see here to check gradient loss!
+            
+            if display:
+                print("softmax forward " + str(temp_activated.shape))
+                
+        elif self.activations[i] == "identity":
+            temp_activated = self.identity_forward(temp_affined, out=activation_out)  # see here to check gradient loss!
+            
+            if display:
+                print("identity forward " + str(temp_activated.shape))
+                
+        else:
+            raise Exception("Layer" + str(i+1) + ": " + "activation not successful")
+        
+        if profiler is not None:
+            profiler.stop("activation", i, section)
+        
+        return temp_affined, temp_activated
+    
+    
+    def recompute_segment(self, start, stop, batch_size):
+        
+        #rebuilds pre-activations of layers start..stop-1 and the layer inputs in between from the kept input of layer 'start'
+        #the same kernels run on the same inputs, so the rebuilt arrays are bit-identical to the ones a normal forward keeps
+        
+        temp_x = self.fan_ins[start]
+        
+        for i in range(start, stop):
+            
+            #running statistics were updated by forward already
+            if i == stop-1:
+                #the activation of the segment's last layer is kept already
+                self.fan_outs[i] = self.affine_forward(temp_x, self.w_layers[i], self.b_layers[i])
+                if self.batch_norm[i]:
+                    self.fan_outs[i] = self.batch_normalize_forward(i, self.fan_outs[i], update_stats=False)
+            else:
+                self.fan_outs[i], self.fan_ins[i+1] = self.layer_forward(i, temp_x, batch_size, update_stats=False)
+                temp_x = self.fan_ins[i+1]
+        
+        return
+    
+    
+    def get_recompute_interval(self, recompute):
+        
+        #None disables recomputation, True picks k = ceil(sqrt(L)) so about 2*sqrt(L) layer activations are alive at once
+        
+        if recompute is None or recompute is False:
+            return None
+        
+        if recompute is True:
+            return max(int(np.ceil(np.sqrt(len(self.w_layers)))), 1)
+        
+        if type(recompute) != int or recompute < 1:
+            raise Exception("'recompute' must be True or a positive integer number of layers per segment")
+        
+        return recompute
+    
+    
+    def backward(self, y, t, batch_size, display = False, workspace=None):
+        
+        t = self.cast(t)
+        
+        profiler = self.profiler
         
-        #prepare memory lists
+        #prepare gradient lists, filled from the last layer to the first
         
-        activation_type_history = self.activations[::-1]
+        if workspace is None:
+            self.w_gradients = [None]*len(self.w_layers)
+            self.b_gradients = [None]*len(self.w_layers)
+        else:
+            self.w_gradients = workspace.w_gradients
+            self.b_gradients = workspace.b_gradients
+        
+        last = len(self.w_layers)-1
         
-        affine_outputs_history = self.fan_outs[::-1]
-        affine_inputs_history = self.fan_ins[::-1]
+        if workspace is None:
+            loss_out = None
+        else:
+            loss_out = workspace.propagations[last]
         
-        layers_reversed = self.w_layers[::-1]
+        if profiler is not None:
+            section = profiler.start()
         
         #back propagate loss function, omit if it's softmax-cross entroy' combination
         if self.loss == "cross_entropy":
@@ -330,83 +493,81 @@ class ANN():
                 if not self.strict:         
                     pass
                 else:
-                    propagation = self.cross_entropy_backward(y, t)
+                    propagation = self.cross_entropy_backward(y, t, out=loss_out)
             else:
-                propagation = self.cross_entropy_backward(y, t)
+                propagation = self.cross_entropy_backward(y, t, out=loss_out)
             
         elif self.loss == "mean_square":
-            propagation = self.mean_square_backward(y, t)
+            propagation = self.mean_square_backward(y, t, out=loss_out)
         
+        if profiler is not None:
+            profiler.stop("loss", None, section)
         
-        for i in range(len(self.w_layers)):
+        interval = self.recompute_interval
+        
+        for i in range(last, -1, -1):
             
-            if activation_type_history[i] == "sigmoid":
-                propagation = self.sigmoid_backward(affine_outputs_history[i], affine_inputs_history[i], propagation)
-                
-                x_grad, layer_grad, b_grad = self.affine_backward(affine_inputs_history[i+1], layers_reversed[i], propagation) #the first element of'affine_inputs_history' is the final output of forward propagation and has been taken care of
-                
-                self.w_gradients.append(layer_grad)
-                self.b_gradients.append(b_grad)
-                
-                propagation = x_grad
-                
-                if display:
-                    print("sigmoid backward " + str(layer_grad.shape))
-                
-            elif activation_type_history[i] == "relu":
-                propagation = self.relu_backward(affine_outputs_history[i], propagation)
-                
-                x_grad, layer_grad, b_grad = self.affine_backward(affine_inputs_history[i+1], layers_reversed[i], propagation) #the first element of'affine_inputs_history' is the final output of forward propagation and has been taken care of
-                
-                self.w_gradients.append(layer_grad)
-                self.b_gradients.append(b_grad)
+            #entering a recomputed segment from its last layer
+            if interval is not None and (i == last or (i+1) % interval == 0):
+                self.recompute_segment(i - i % interval, i+1, batch_size)
+            
+            if workspace is None:
+                delta_out, x_out, w_out = None, None, None
+            else:
+                delta_out, w_out = workspace.deltas[i], workspace.w_gradients[i]
+                x_out = workspace.propagations[i-1] if i > 0 else None
+            
+            if profiler is not None:
+                section = profiler.start()
+            
+            if self.activations[i] == "sigmoid":
+                propagation = self.sigmoid_backward(self.fan_outs[i], self.fan_ins[i+1], propagation, out=delta_out)
                 
-                propagation = x_grad
-                                
-                if display:
-                    print("relu backward " + str(layer_grad.shape))
+            elif self.activations[i] == "relu":
+                propagation = self.relu_backward(self.fan_outs[i], propagation, out=delta_out)
                     
-            elif activation_type_history[i] == "softmax":
+            elif self.activations[i] == "softmax":
                 
-                if self.loss =="cross_entropy" and i==0:
+                if self.loss =="cross_entropy" and i==last:
                     if not self.strict:
-                        propagation = y-t
+                        propagation = np.subtract(y, t, out=delta_out)
                     else:
-                        propagation = self.softmax_backward(affine_outputs_history[i], propagation, batch_size)
+                        propagation = self.softmax_backward(self.fan_outs[i], propagation, batch_size, out=delta_out)
                 else:
-                    propagation = self.softmax_backward(affine_outputs_history[i], propagation, batch_size)
-                
-                x_grad, layer_grad, b_grad = self.affine_backward(affine_inputs_history[i+1], layers_reversed[i], propagation) #the first element of'affine_inputs_history' is the final output of forward propagation and has been taken care of
-                
-                self.w_gradients.append(layer_grad)
-                self.b_gradients.append(b_grad)
-                
-                propagation = x_grad
-                       
-                if display:
-                    print("softmax backward " + str(layer_grad.shape))
+                    propagation = self.softmax_backward(self.fan_outs[i], propagation, batch_size, out=delta_out)
                     
-            elif activation_type_history[i] == "identity":
-                propagation = self.identity_backward(affine_outputs_history[i], propagation)
-                
-                x_grad, layer_grad, b_grad = self.affine_backward(affine_inputs_history[i+1], layers_reversed[i], propagation) #the first element of'affine_inputs_history' is the final output of forward propagation and has been taken care of
-                
-                self.w_gradients.append(layer_grad)
-                self.b_gradients.append(b_grad)
-                
-                propagation = x_grad
-                
-                if display:
-                    print("identity backward " + str(layer_grad.shape))
+            elif self.activations[i] == "identity":
+                propagation = self.identity_backward(self.fan_outs[i], propagation, out=delta_out)
                     
             else:
-                raise Exception("Gradient Propagation in Layer" + str(len(self.w_layers) - i) + " not successful")
-        
+                raise Exception("Gradient Propagation in Layer" + str(i+1) + " not successful")
+            
+            if self.batch_norm[i]:
+                propagation = self.batch_normalize_backward(i, propagation)
+            
+            x_grad, layer_grad, b_grad = self.affine_backward(self.fan_ins[i], self.w_layers[i], propagation, x_out=x_out, w_out=w_out, x_gradient=(i > 0))
+            
+            if profiler is not None:
+                profiler.stop("backward", i, section)
+            
+            self.w_gradients[i] = layer_grad
+            self.b_gradients[i] = b_grad
+            
+            propagation = x_grad
+            
+            #leaving a recomputed segment, its rebuilt arrays are released before the next one is built
+            if interval is not None and i % interval == 0:
+                stop = min(i + interval, last+1)
+                for j in range(i, stop):
+                    self.fan_outs[j] = None
+                    if j > i:
+                        self.fan_ins[j] = None
+                if stop <= last:
+                    self.fan_ins[stop] = None
+            
             if display:
-                    print("Layer" + str(len(self.w_layers) - i) + ": " + "propagated\n")
-        
-        self.w_gradients = self.w_gradients[::-1]
-        self.b_gradients = self.b_gradients[::-1]
+                print(self.activations[i] + " backward " + str(layer_grad.shape))
+                print("Layer" + str(i+1) + ": " + "propagated\n")
         
         if display:
                        
@@ -420,18 +581,28 @@ class ANN():
         return self.w_gradients, self.b_gradients
         
         
-    def predict(self, x):
+    def predict(self, x, chunk_size=None, n_threads=1, out=None):
+        
+        #with 'chunk_size', 'n_threads' or 'out', inputs are predicted 'chunk_size' inputs at a time (1024 by default) into one output,
+        #'out' if given, so memory grows with the chunk size rather than the input size; a Dataset is always chunked
+        if isinstance(x, Dataset) or chunk_size is not None or n_threads != 1 or out is not None:
+            return self.predict_chunks(x, 1024 if chunk_size is None else chunk_size, n_threads, out)
         
-        if np.asmatrix(x).shape[0] % self.input_shape[0] != 0:
+        x = self.cast(x)
+        
+        if self.count_rows(x) % self.input_shape[0] != 0:
             raise Exception("size of an input must be a multiple of specified input size of the model object")
         
-        batch_size = int(np.asmatrix(x).shape[0]/self.input_shape[0])
+        batch_size = int(self.count_rows(x)/self.input_shape[0])
         
         temp_x = x
         
+        #batch normalization is folded into the weights, so prediction costs the same with or without it
+        w_layers, b_layers = self.inference_layers()
+        
         for i in range(len(self.w_layers)): #affine and activation
             
-            temp_affined = self.affine_forward(temp_x, self.w_layers[i], self.b_layers[i])
+            temp_affined = self.affine_forward(temp_x, w_layers[i], b_layers[i])
             
             if self.activations[i] == "sigmoid":
                 temp_activated = self.sigmoid_forward(temp_affined)  # see here to check gradient loss!
@@ -455,262 +626,1106 @@ class ANN():
         return network_out
     
     
-    def train(self, x, t, learning_rate, iteration, save_log=False, flush_log=True, display=True, error_round=10):
+    def predict_chunks(self, x, chunk_size, n_threads, out):
         
-        if display:
-            print(f"train session (learning rate: {str(learning_rate)} iteration: {str(iteration)})")
+        #chunks run on compiled plans with preallocated buffers, one plan per thread sharing the same weights
+        #numpy releases the GIL in BLAS and in elementwise loops, so chunks on different threads run in parallel
         
-        if flush_log:
-            self.error_log = []
+        if chunk_size < 1:
+            raise Exception("'chunk_size' must be a positive integer")
+        if n_threads < 1:
+            raise Exception("'n_threads' must be a positive integer")
         
-        recent_error_memory = [] #a list for recent 5 error_logs 
-        initial_five_passed_flag = False
+        if isinstance(x, Dataset):
+            x.count_inputs(self.input_shape[0])
+            x = x.x
+        elif is_sparse(x):
+            x = self.cast(x)
+        elif not hasattr(x, "shape"):
+            x = np.asarray(x)
         
-        start_time = time.time()
+        #a 1-dimensional input is one row, its output is 1-dimensional as it is for 'predict'
+        if not is_sparse(x) and x.ndim == 1:
+            return self.predict_chunks(x.reshape(1, -1), chunk_size, n_threads, None if out is None else out.reshape(1, -1)).reshape(-1)
         
-        for i in range(iteration):
-
-            if save_log:
-                out, error, batch_size= self.forward(x, t)
-                self.backward(out, t, batch_size)
-                self.error_log.append(error)
-            else:
-                out, error, batch_size = self.forward(x, t)
-                self.backward(out, t, batch_size)
-                  
-            #update
-            nparray_layers = np.array(self.w_layers, dtype=object)
-            nparray_biases = np.array(self.b_layers)
-            nparray_layer_gradients = np.array(self.w_gradients, dtype=object)
-            nparray_b_gradients = np.array(self.b_gradients)
-            
-            self.w_layers = list(nparray_layers - nparray_layer_gradients*learning_rate)
-            self.b_layers = list(nparray_biases - nparray_b_gradients*learning_rate)
-            
-
-            #check for fatal learning issues
-            if i<5:
-                recent_error_memory.append(error)
-            else:
-                if i == 5:
-                    initial_five_passed_flag = True
-                del recent_error_memory[0]
-                recent_error_memory.append(error)
-            
-            for j in range(len(self.w_layers)):
-                gradient_zero_layer_flag = False
-                gradient_zero_layer_indexes = []
-                if np.count_nonzero(nparray_layer_gradients[j] == 0) == np.size(nparray_layer_gradients[j]):
-                    gradient_zero_layer_flag = True
-                    gradient_zero_layer_indexes.append(j+1)
-            
-            if gradient_zero_layer_flag:
-            
-                #terminate train if the last layer's gradients equal to 0
-                if len(self.w_layers) in gradient_zero_layer_indexes:  
-                    print(f"Session Terminated: layer{gradient_zero_layer_indexes}'s gradients equal to 0, step: {str(i+1)} error: {str(round(error, error_round))}                                      ")
-                    return
-                else:
-                    print(f"Warning: layer{gradient_zero_layer_indexes}'s gradient equals to 0, step: {str(i+1)} error: {str(round(error, error_round))}                                      ")
-
-            if initial_five_passed_flag and recent_error_memory[0] == recent_error_memory[1] == recent_error_memory[2] == recent_error_memory[3] == recent_error_memory[4]:
-                print(f"Session Terminated: no learning effect for recent 5 steps, step: {str(i+1)} error: {str(round(error, error_round))}                                      ")
-                return
-
-            if display:
-                if i < 0.5*iteration/10:
-                    print(f"process                      0%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r", flush=True)
-                elif i < 1*iteration/10:
-                    print(f"process =                    5%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 1.5*iteration/10:
-                    print(f"process ==                   10%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 2*iteration/10:
-                    print(f"process ===                  15%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 2.5*iteration/10:
-                    print(f"process ====                 20%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 3*iteration/10:
-                    print(f"process =====                25%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 3.5*iteration/10:
-                    print(f"process ======               30%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 4*iteration/10:
-                    print(f"process =======              35%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 4.5*iteration/10:
-                    print(f"process ========             40%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 5*iteration/10:
-                    print(f"process =========            45%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 5.5*iteration/10:
-                    print(f"process ==========           50%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 6*iteration/10:
-                    print(f"process ===========          55%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 6.5*iteration/10:
-                    print(f"process ============         60%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 7*iteration/10:
-                    print(f"process =============        65%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 7.5*iteration/10:
-                    print(f"process ==============       70%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 8*iteration/10:
-                    print(f"process ===============      75%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 8.5*iteration/10:
-                    print(f"process ================     80%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 9*iteration/10:
-                    print(f"process =================    85%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 9.5*iteration/10:
-                    print(f"process ==================   90%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-                elif i < 10*iteration/10:
-                    print(f"process ===================  95%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r")
-
-        if display:
-            print(f"process ==================== 100%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\n\n", flush=False)
+        rows = self.count_rows(x)
         
-        end_time = time.time()
+        if rows % self.input_shape[0] != 0:
+            raise Exception("size of an input must be a multiple of specified input size of the model object")
         
-        t = end_time - start_time
-        h = int(round(t//3600, 0))
-        m = int(round((t-(3600*h))//60, 0))
-        s = int(round(t-(3600*h)-(60*m), 0))
+        if out is None:
+            out = np.empty((rows, self.w_layers[-1].shape[1]), dtype=self.dtype)
+        elif out.shape != (rows, self.w_layers[-1].shape[1]):
+            raise Exception("'out' must have the shape " + str((rows, self.w_layers[-1].shape[1])))
         
-        if display:
-            print(str(h) + "hour " + str(m) + "min " +  str(s)+ "sec taken")
-            
-        return
-    
-    
-    
-    #활성화 함수 정의
-
-    def sigmoid_forward(self, x):
-        return 1/(1+np.exp(-x))
+        #chunks hold whole inputs, and no more of them than there are
+        chunk_size = min(chunk_size, max(rows // self.input_shape[0], 1))
+        chunk_rows = chunk_size * self.input_shape[0]
+        
+        plan = self.compile_inference(chunk_size)
+        
+        if n_threads == 1:
+            for start in range(0, rows, chunk_rows):
+                plan.predict(x[start:start+chunk_rows], out[start:start+chunk_rows])
+            return out
+        
+        #threads are imported here only, so that importing seadiver stays light
+        import concurrent.futures
+        import queue
+        
+        plans = queue.SimpleQueue()
+        plans.put(plan)
+        for _ in range(n_threads - 1):
+            plans.put(plan.clone())
+        
+        def predict_chunk(start):
+            chunk_plan = plans.get()
+            try:
+                chunk_plan.predict(x[start:start+chunk_rows], out[start:start+chunk_rows])
+            finally:
+                plans.put(chunk_plan)
+            return
+        
+        with concurrent.futures.ThreadPoolExecutor(n_threads) as executor:
+            for _ in executor.map(predict_chunk, range(0, rows, chunk_rows)):
+                pass
+        
+        return out
     
-    def sigmoid_backward(self, ret_x, ret_y, propagation):
-        #np.exp(-ret_x)*(ret_y**2)*propagation
-        return ret_y*(1-ret_y)*propagation
-
-    def relu_forward(self, x):
-        return np.maximum(0, x)
     
-    def relu_backward(self, ret_x, propagation):
+    def profile(self, track_memory=False, trace=True, max_events=1000000):
         
-        temp_grad = np.zeros(ret_x.shape, dtype=float)
-        temp_grad[ret_x>0] = ret_x[ret_x>0]
-                
-        return temp_grad*propagation
-
-    def softmax(self, x):
-        return np.exp(x - np.max(x))/np.sum(np.exp(x - np.max(x)))
+        #context manager recording time per layer and phase while it is active, see seadiver.profiler
+        return prof.Profiler(track_memory, trace, max_events, model=self)
     
-    def softmax_individual(self, x, i):   #when x is a flattened numpy array or matrix, returns the softmax value of x[i]
+    
+    def evaluate(self, x, t=None, chunk_size=None):
         
-        if type(x) == np.ndarray:
-            return np.exp(x[i] - np.max(x))/np.sum(np.exp(x - np.max(x)))
+        #loss of the model on (x, t) in inference mode, no training buffers are kept
+        #a Dataset is scored 'chunk_size' inputs at a time, its answers are used as 't'
         
-        elif type(x) == np.matrix:
-            return np.exp(x[0, i] - np.max(x))/np.sum(np.exp(x - np.max(x)))
+        if isinstance(x, Dataset):
+            
+            if x.t is None:
+                raise Exception("the Dataset has no answers ('t') to evaluate on")
+            if chunk_size is None:
+                chunk_size = 1024
+            
+            chunks = x.batches(chunk_size, self.input_shape[0])
+            n_inputs = x.count_inputs(self.input_shape[0])
         
         else:
-            raise Exception("unsupported argument type: takes numpy array or matrix")
-    
-    def softmax_forward(self, x, batch_size):
-    
-        temp_x =  copy.deepcopy(np.asmatrix(x.reshape(batch_size, -1)))  #batch 내의 각 input을 단위로 softmax를 수행하기 위해 reshape를 수행
+            if t is None:
+                raise Exception("'t' must be specified when 'x' is not a Dataset")
+            
+            chunks = [(x, t)]
+            n_inputs = self.count_rows(x) // self.input_shape[0]
         
-        for i in range(len(temp_x)):
-            temp_x[i] = self.softmax(temp_x[i])
+        error = 0
         
-        return np.asarray(temp_x.reshape(x.shape))   #원래 형상으로 복귀하여 전달
-                            
-    def softmax_backward(self, ret_x, propagation, batch_size):
-
-        temp_x = np.asmatrix(ret_x.reshape(batch_size, -1))  #batch 내의 각 input을 단위로 softmax를 수행하기 위해 reshape를 수행
-        temp_prop = propagation.reshape(batch_size, -1)
-
-        temp_grads_batch = np.array([])
-        for batch_index in range(len(temp_x)):
-
-            temp_grads = np.array([])
-            for i in range(temp_x[batch_index].shape[1]):
-
-                temp_subgrads = np.array([])
-                for j in range(temp_x[batch_index].shape[1]):
-                    if i == j:
-                        #derivative for the element in corresponding position
-                        temp_subgrads = np.append(temp_subgrads, self.softmax_individual(temp_x[batch_index], i)*(1-self.softmax_individual(temp_x[batch_index], i)))
-                    elif i!=j:
-                        #derivatives for the rest
-                        temp_subgrads = np.append(temp_subgrads, -self.softmax_individual(temp_x[batch_index], i)*self.softmax_individual(temp_x[batch_index], j))
-                    else:
-                        raise Exception()
-                        
-                temp_grads = np.append(temp_grads, np.sum(temp_subgrads*temp_prop[batch_index]))
-
-            temp_grads_batch = np.append(temp_grads_batch, temp_grads)
+        for x_chunk, t_chunk in chunks:
             
-        return temp_grads_batch.reshape(ret_x.shape)
-                
+            y = self.predict(x_chunk)
+            t_chunk = self.cast(t_chunk)
             
-    def identity_forward(self, x):
-        return x
-    
-    def identity_backward(self, ret_x, propagation):
-        return np.ones(ret_x.shape)*propagation
-
-
-    #손실 함수 정의: y는 forward의 최종 output, t는 정답
-
-    def mean_square_forward(self, y, t):
-        return 0.5*np.sum((y-t)**2)
-
-    def mean_square_backward(self, y, t):
-        return y-t
+            #cross entropy is averaged over all inputs once every chunk is summed
+            if self.loss == "cross_entropy":
+                error += self.cross_entropy(y, t_chunk)
+            elif self.loss == "mean_square":
+                error += self.mean_square_forward(y, t_chunk)
+            else:
+                raise Exception("Loss function not successfull")
+        
+        if self.loss == "cross_entropy":
+            error = error / n_inputs
+        
+        return error
     
-    def cross_entropy(self, y, t):
-        y[y==0] = y[y==0] + self.delta
-        return -np.sum(t*np.log(y))
     
-    def cross_entropy_forward(self, y, t, batch_size):   
-        return self.cross_entropy(y, t)/batch_size
+    def compile_inference(self, max_batch=1024, sparse=False):
         
-    def cross_entropy_backward(self, y, t):
-        y[y==0] = y[y==0] + self.delta
-        return -t/y
-
-    
-    #affine 연산 함수
-
-    def affine_forward(self, x, w, b):  
-        return np.dot(x, w) + b
-
-    def affine_backward(self, ret_x, ret_w, propagation):
+        #returns a frozen predictor with preallocated buffers for up to 'max_batch' inputs per call
+        #'sparse' stores mostly-zero (pruned) layers in CSR and runs them as sparse products, see InferencePlan
+        w_layers, b_layers = self.inference_layers()
         
-        x_gradient = np.asarray(np.dot(propagation, np.asmatrix(ret_w).T))
-        w_gradient = np.asarray(np.dot(np.asmatrix(ret_x).T, propagation))
-        b_gradient = np.sum(propagation)
+        return inference.InferencePlan(self.input_shape, w_layers, b_layers, self.activations, max_batch, sparse)
     
-        return x_gradient, w_gradient, b_gradient
     
-    def batch_normalize_forward(self, x):
+    def quantize(self, calibration_x, per_channel=True, eval_x=None, max_batch=1024):
+        
+        #builds an int8 predictor (inference.QuantizedPlan), keeps it as 'self.quantized' and returns it
+        #layer input scales are calibrated on 'calibration_x', weight scales are set per output column with 'per_channel'
+        #the plan's 'accuracy' compares it with the float 'predict' on 'eval_x', or on the calibration inputs if not given
+        
+        x = self.cast(calibration_x)
+        if is_sparse(x):
+            x = x.toarray()
+        
+        if self.count_rows(x) % self.input_shape[0] != 0:
+            raise Exception("size of an input must be a multiple of specified input size of the model object")
+        
+        batch_size = int(self.count_rows(x)/self.input_shape[0])
         
-        temp_x = copy.deepcopy(x)
+        #symmetric scales map the largest magnitude seen to 127, all-zero ranges keep a scale of 1
+        x_scales = []
+        temp_x = x
+        for i in range(len(self.w_layers)):
+            x_scales.append(float(np.max(np.abs(temp_x))) / 127 or 1.0)
+            _, temp_x = self.layer_forward(i, temp_x, batch_size, training=False)
+        
+        #batch normalization is folded before the weights are quantized
+        w_layers, b_layers = self.inference_layers()
+        
+        q_layers = []
+        w_scales = []
+        for w in w_layers:
+            if per_channel:
+                scale = np.max(np.abs(w), axis=0) / 127
+            else:
+                scale = np.array([np.max(np.abs(w)) / 127])
+            scale = scale.astype(np.float64)
+            scale[scale == 0] = 1.0
+            
+            q_layers.append(np.clip(np.rint(w / scale), -127, 127).astype(np.int8))
+            w_scales.append(scale)
         
-        mean = temp_x.mean()
-        std = temp_x.std()
+        plan = inference.QuantizedPlan(self.input_shape, q_layers, w_scales, x_scales, b_layers, self.activations, max_batch)
         
-        temp_x = (temp_x - mean)/(std + self.delta)
+        if eval_x is None:
+            eval_x = x
+        plan.accuracy = plan.report(eval_x, self.predict(eval_x))
         
-        return temp_x
+        self.quantized = plan
+        
+        return plan
+    
     
-    def batch_normalize_backward(self, ret_x, propagation):
+    def prune(self, sparsity, per_layer=True):
+        
+        #zeroes the smallest weights by magnitude and keeps them at zero through later training, returns the sparsity of every layer
+        #'sparsity' is the fraction of weights removed, for every layer with 'per_layer' or over all weights at once otherwise
+        #a list gives one sparsity per layer, pruning again only removes more weights
+        
+        if type(sparsity) == list or type(sparsity) == tuple:
+            if not per_layer:
+                raise Exception("a 'sparsity' per layer requires 'per_layer'")
+            if len(sparsity) != len(self.w_layers):
+                raise Exception("'sparsity' must have one value per layer")
+            sparsities = list(sparsity)
+        else:
+            sparsities = [sparsity]*len(self.w_layers)
         
+        for value in sparsities:
+            if not 0 <= value < 1:
+                raise Exception("'sparsity' must be in [0, 1)")
         
+        if self.masks is None:
+            self.masks = [np.ones(w.shape, dtype=bool) for w in self.w_layers]
         
+        #pruned weights are exactly zero, so they are always among the smallest and stay pruned
+        if per_layer:
+            for w, mask, value in zip(self.w_layers, self.masks, sparsities):
+                count = int(round(value * w.size))
+                if count > 0:
+                    index = np.argpartition(np.abs(w).ravel(), count-1)[:count]
+                    mask.ravel()[index] = False
         
-        return
+        else:
+            magnitudes = np.concatenate([np.abs(w).ravel() for w in self.w_layers])
+            count = int(round(sparsities[0] * magnitudes.size))
+            if count > 0:
+                removed = np.zeros(magnitudes.size, dtype=bool)
+                removed[np.argpartition(magnitudes, count-1)[:count]] = True
+                offset = 0
+                for w, mask in zip(self.w_layers, self.masks):
+                    mask[removed[offset:offset+w.size].reshape(w.shape)] = False
+                    offset += w.size
+        
+        self.apply_masks()
+        
+        return [1 - np.count_nonzero(mask) / mask.size for mask in self.masks]
     
     
-    #util: export
+    def apply_masks(self):
+        
+        #zeroes pruned weights in place, called after every update of a pruned model
+        
+        if self.masks is not None:
+            for w, mask in zip(self.w_layers, self.masks):
+                np.multiply(w, mask, out=w)
+            self.folded = None
+        
+        return
     
-    def export(self, directory= r".\\", file_name= None, include= "essential"):
+    
+    def train(self, x, t, learning_rate, iteration=None, save_log=False, flush_log=True, display=True, error_round=10, batch_size=None, epochs=None, shuffle=True, optimizer=None, workspace=True, n_workers=None, recompute=None, validation=None, eval_every=None, patience=None, min_delta=0.0, restore_best=True, checkpoint=None, memory_budget=None):
+        
+        #full-batch mode runs 'iteration' steps over the whole 'x'
+        #mini-batch mode is used when 'batch_size' or 'epochs' is given, when 'x' is a Dataset, or when 'x' is an iterable of (x, t) batches and 't' is None
+        #'recompute' (True or a number of layers k) keeps only every k-th layer input through forward and rebuilds the rest during backward
+        #'validation' ((x, t) or a Dataset) is evaluated every 'eval_every' steps, once per epoch by default
+        #training stops after 'patience' evaluations without an improvement larger than 'min_delta', and the best weights are restored at the end
+        #'checkpoint' is a seadiver.checkpoint.Checkpointer, called after every step to save the model in the background
+        #batch_size="auto" picks the largest mini-batch whose estimated training memory fits in 'memory_budget' (see 'memory_report')
+        
+        minibatch = batch_size is not None or epochs is not None or t is None
+        
+        if not minibatch and iteration is None:
+            raise Exception("'iteration' must be specified for full-batch training")
+        
+        if isinstance(x, Dataset):
+            if t is not None:
+                raise Exception("'t' must be None when 'x' is a Dataset")
+            if x.t is None:
+                raise Exception("the Dataset has no answers ('t') to train on")
+            if batch_size is None:
+                raise Exception("'batch_size' must be specified when 'x' is a Dataset")
+        
+        elif t is None and batch_size is not None:
+            raise Exception("'batch_size' cannot be used when 'x' is an iterable of (x, t) batches")
+        
+        #sparse inputs are converted to CSR once, mini-batches are row slices of it
+        elif is_sparse(x):
+            x = self.cast(x)
+        
+        if batch_size == "auto":
+            
+            if memory_budget is None:
+                raise Exception("'memory_budget' must be specified when 'batch_size' is 'auto'")
+            if n_workers is not None and n_workers > 1:
+                raise Exception("batch_size='auto' is not supported with data-parallel training")
+            
+            if isinstance(x, Dataset):
+                n_inputs = x.count_inputs(self.input_shape[0])
+            else:
+                n_inputs = self.count_rows(x) // self.input_shape[0]
+            
+            batch_size = self.auto_batch_size(memory_budget, workspace, recompute, optimizer, n_inputs)
+            
+            if display:
+                print(f"batch size {str(batch_size)} selected for a memory budget of {str(parse_bytes(memory_budget))} bytes")
+        
+        elif memory_budget is not None:
+            raise Exception("'memory_budget' is only used when 'batch_size' is 'auto'")
+        
+        if minibatch and epochs is None and iteration is None:
+            epochs = 1
+        
+        #a quantized predictor no longer matches the weights once they are trained
+        self.quantized = None
+        
+        if recompute and n_workers is not None and n_workers > 1:
+            raise Exception("'recompute' is not supported with data-parallel training")
+        
+        if any(self.batch_norm) and n_workers is not None and n_workers > 1:
+            raise Exception("batch normalization is not supported with data-parallel training")
+        
+        if validation is not None:
+            
+            if isinstance(validation, Dataset):
+                validation = (validation, None)
+            elif len(validation) != 2:
+                raise Exception("'validation' must be an (x, t) pair or a Dataset")
+            
+            if eval_every is None:
+                if minibatch:
+                    eval_every = self.count_steps(x, t, None, batch_size, 1)
+                    if eval_every is None:
+                        raise Exception("'eval_every' must be specified when the number of batches per epoch is unknown")
+                else:
+                    eval_every = 1
+            
+            if eval_every < 1:
+                raise Exception("'eval_every' must be a positive integer")
+        
+        elif patience is not None:
+            raise Exception("'patience' requires a 'validation' set")
+        
+        #an optimizer given by name or instance replaces the model's one, otherwise its state carries over from the last session
+        if optimizer is not None:
+            self.optimizer = optim.get(optimizer)
+        elif self.optimizer is None:
+            self.optimizer = optim.SGD()
+        
+        total_steps = self.count_steps(x, t, iteration, batch_size, epochs)
+        
+        if display:
+            if minibatch:
+                print(f"train session (learning rate: {str(learning_rate)} batch size: {str(batch_size)} epochs: {str(epochs)} steps: {str(total_steps)})")
+            else:
+                print(f"train session (learning rate: {str(learning_rate)} iteration: {str(iteration)})")
+        
+        if flush_log:
+            self.error_log = []
+        
+        recent_error_memory = [] #a list for recent 5 error_logs 
+        initial_five_passed_flag = False
+        
+        #validation state, the best weights are copied into buffers allocated on the first evaluation
+        self.validation_log = []
+        self.best_step = None
+        best_error = None
+        stale_evaluations = 0
+        best_w_layers = None
+        best_b_layers = None
+        
+        #buffers are allocated once per batch shape and reused by every step of the session
+        self.workspaces = {}
+        
+        start_time = time.time()
+        
+        if minibatch:
+            batches = self.epoch_batches(x, t, batch_size, epochs, shuffle)
+        else:
+            #convert once here rather than on every step
+            batches = itertools.repeat((self.cast(x), self.cast(t)), iteration)
+        
+        if iteration is not None:
+            batches = itertools.islice(batches, iteration)
+        
+        #data-parallel sessions move the weights into shared memory until the session ends
+        #multiprocessing is imported for these sessions only
+        if n_workers is not None and n_workers > 1:
+            from seadiver import parallel
+            data_parallel = parallel.DataParallel(self, n_workers)
+        else:
+            data_parallel = None
+        
+        try:
+            
+            i = -1
+            for i, (x_batch, t_batch) in enumerate(batches):
+                
+                error = self.train_step(x_batch, t_batch, learning_rate, workspace, data_parallel, recompute)
+                
+                if save_log:
+                    self.error_log.append(error)
 
-        compat_include_params = {"all", "essential", "error_log", "gradients", "fan_io"}
+                #check for fatal learning issues
+                if i<5:
+                    recent_error_memory.append(error)
+                else:
+                    if i == 5:
+                        initial_five_passed_flag = True
+                    del recent_error_memory[0]
+                    recent_error_memory.append(error)
+                
+                for j in range(len(self.w_layers)):
+                    gradient_zero_layer_flag = False
+                    gradient_zero_layer_indexes = []
+                    if not np.any(self.w_gradients[j]):
+                        gradient_zero_layer_flag = True
+                        gradient_zero_layer_indexes.append(j+1)
+                
+                if gradient_zero_layer_flag:
+                
+                    #terminate train if the last layer's gradients equal to 0
+                    if len(self.w_layers) in gradient_zero_layer_indexes:  
+                        print(f"Session Terminated: layer{gradient_zero_layer_indexes}'s gradients equal to 0, step: {str(i+1)} error: {str(round(error, error_round))}                                      ")
+                        return
+                    else:
+                        print(f"Warning: layer{gradient_zero_layer_indexes}'s gradient equals to 0, step: {str(i+1)} error: {str(round(error, error_round))}                                      ")
+
+                if initial_five_passed_flag and recent_error_memory[0] == recent_error_memory[1] == recent_error_memory[2] == recent_error_memory[3] == recent_error_memory[4]:
+                    print(f"Session Terminated: no learning effect for recent 5 steps, step: {str(i+1)} error: {str(round(error, error_round))}                                      ")
+                    return
+
+                if checkpoint is not None:
+                    checkpoint.step(self)
+                
+                if validation is not None and (i+1) % eval_every == 0:
+                    
+                    validation_error = self.evaluate(validation[0], validation[1])
+                    self.validation_log.append((i+1, validation_error))
+                    
+                    if best_error is None or validation_error < best_error - min_delta:
+                        
+                        best_error = validation_error
+                        self.best_step = i+1
+                        stale_evaluations = 0
+                        
+                        if restore_best:
+                            if best_w_layers is None:
+                                best_w_layers = [np.empty_like(w) for w in self.parameter_arrays()]
+                                best_b_layers = np.empty(len(self.b_layers), dtype=self.dtype)
+                            for w, best_w in zip(self.parameter_arrays(), best_w_layers):
+                                np.copyto(best_w, w)
+                            best_b_layers[:] = self.b_layers
+                    
+                    else:
+                        stale_evaluations += 1
+                        
+                        if patience is not None and stale_evaluations >= patience:
+                            if display:
+                                print(f"Early Stopping: no validation improvement for {str(patience)} evaluations, step: {str(i+1)} best validation error: {str(round(best_error, error_round))} at step: {str(self.best_step)}                                      ")
+                            break
+
+                if display:
+                    self.display_progress(i, total_steps, error, error_round)
+        
+        finally:
+            if data_parallel is not None:
+                data_parallel.close()
+            
+            #weights are restored into the model's own arrays, after data-parallel sessions handed them back
+            if best_w_layers is not None and self.best_step != i+1:
+                for w, best_w in zip(self.parameter_arrays(), best_w_layers):
+                    np.copyto(w, best_w)
+                self.b_layers = list(best_b_layers)
+                self.folded = None
+            
+            #checkpoints of the session are on disk once 'train' returns
+            if checkpoint is not None:
+                checkpoint.wait()
+
+        if i < 0:
+            raise Exception("no batch was given for training")
+
+        if display:
+            print(f"process ==================== 100%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\n\n", flush=False)
+        
+        end_time = time.time()
+        
+        t = end_time - start_time
+        h = int(round(t//3600, 0))
+        m = int(round((t-(3600*h))//60, 0))
+        s = int(round(t-(3600*h)-(60*m), 0))
+        
+        if display:
+            print(str(h) + "hour " + str(m) + "min " +  str(s)+ "sec taken")
+            
+        return
+    
+    
+    def train_step(self, x, t, learning_rate, workspace=True, data_parallel=None, recompute=None):
+        
+        #one forward/backward pass and one parameter update, returns the error of the batch
+        
+        profiler = self.profiler
+        
+        if data_parallel is not None:
+            
+            #forward and backward run in the workers, only their combined wall time is seen here
+            if profiler is not None:
+                section = profiler.start()
+            
+            error, batch_rows = data_parallel.step(x, t)
+            
+            if profiler is not None:
+                profiler.stop("data_parallel", None, section)
+        
+        else:
+            #a workspace would hold every layer's buffers, which is what recomputation avoids
+            if workspace and not recompute:
+                step_workspace = self.get_workspace(x)
+            else:
+                step_workspace = None
+            
+            out, error, batch_rows = self.forward(x, t, workspace=step_workspace, recompute=recompute)
+            self.backward(out, t, batch_rows, workspace=step_workspace)
+        
+        #update, weight matrices are changed in place and biases are updated as one vector
+        if profiler is not None:
+            section = profiler.start()
+        
+        nparray_biases = np.array(self.b_layers, dtype=self.dtype)
+        nparray_b_gradients = np.array(self.b_gradients, dtype=self.dtype)
+        
+        #scales and shifts of normalized layers follow the weights and the bias vector
+        normalized = [i for i in range(len(self.w_layers)) if self.batch_norm[i]]
+        params = self.w_layers + [nparray_biases] + [self.gammas[i] for i in normalized] + [self.betas[i] for i in normalized]
+        grads = self.w_gradients + [nparray_b_gradients] + [self.gamma_gradients[i] for i in normalized] + [self.beta_gradients[i] for i in normalized]
+        
+        self.optimizer.update(params, grads, learning_rate)
+        self.b_layers = list(nparray_biases)
+        
+        #folded inference weights are rebuilt on the next prediction
+        self.folded = None
+        
+        #optimizer state such as momentum would otherwise revive pruned weights
+        if self.masks is not None:
+            self.apply_masks()
+        
+        if profiler is not None:
+            profiler.stop("update", None, section)
+        
+        if data_parallel is not None:
+            data_parallel.publish()
+        
+        return error
+    
+    
+    #util: dtype policy
+    
+    def cast(self, a):
+        
+        #converts inputs to the model's dtype at the boundary, arrays that already match are passed through without a copy
+        
+        if type(a) == np.ndarray and a.dtype == self.dtype:
+            return a
+        
+        #scipy.sparse inputs stay sparse, in CSR layout so that row slices and the first layer's product are fast
+        if is_sparse(a):
+            if a.format != "csr":
+                a = a.tocsr()
+            if a.dtype != self.dtype:
+                a = a.astype(self.dtype)
+            return a
+        
+        return np.asarray(a, dtype=self.dtype)
+    
+    def count_rows(self, x):
+        
+        #number of rows of an input, a 1-dimensional input counts as one row
+        
+        if is_sparse(x):
+            return x.shape[0]
+        
+        return np.asmatrix(x).shape[0]
+    
+    
+    #util: training workspace
+    
+    def get_workspace(self, x):
+        
+        #returns the workspace matching the batch 'x', creating it on first use
+        
+        if is_sparse(x):
+            rows = x.shape[0]
+        elif np.ndim(x) == 2:
+            rows = np.shape(x)[0]
+        else:
+            return None
+        
+        if rows not in self.workspaces or not self.workspaces[rows].fits(self):
+            
+            #keep at most the full-size and the last (smaller) batch shape
+            if len(self.workspaces) >= 2:
+                self.workspaces = {}
+            
+            self.workspaces[rows] = Workspace(self, rows)
+        
+        return self.workspaces[rows]
+
+
+    #util: memory accounting
+
+    def memory_report(self, batch_size, workspace=True, recompute=None, optimizer=None, n_inputs=None):
+
+        #estimated bytes of a training step on mini-batches of 'batch_size' inputs, per layer and in total
+        #'workspace', 'recompute' and 'optimizer' are the ones given to 'train', the model's optimizer (or SGD) by default
+        #arrays held through the step are counted in full, 'transient' is the largest temporary of a single operation on top of them
+        #with 'n_inputs' (inputs per epoch), the workspace kept for a smaller last batch is counted as well
+
+        if batch_size < 1:
+            raise Exception("'batch_size' must be a positive integer")
+
+        if optimizer is None:
+            optimizer = self.optimizer if self.optimizer is not None else optim.SGD()
+        else:
+            optimizer = optim.get(optimizer)
+
+        #optimizer state plus one scratch array per parameter
+        slots = len(optimizer.buffer_names) + 1
+
+        interval = self.get_recompute_interval(recompute)
+        if interval is not None:
+            workspace = False
+
+        itemsize = self.dtype.itemsize
+        rows = batch_size * self.input_shape[0]
+        last = len(self.w_layers)-1
+        widths = [w.shape[1] for w in self.w_layers]
+
+        #softmax with (non-strict) cross entropy starts backward from y - t, without a loss gradient or a softmax jacobian product
+        fused_output = self.loss == "cross_entropy" and self.activations[last] == "softmax" and not self.strict
+
+        layers = []
+        planes = []
+
+        for i, w in enumerate(self.w_layers):
+
+            plane = rows * widths[i] * itemsize
+            vector = widths[i] * itemsize
+            identity = self.activations[i] == "identity"
+            softmax_backward = self.activations[i] == "softmax" and not (i == last and fused_output)
+
+            #the scalar bias, and the scale, shift and running statistics of a normalized layer
+            trainable = w.nbytes + itemsize + (2*vector if self.batch_norm[i] else 0)
+            weights = trainable + (2*vector if self.batch_norm[i] else 0)
+
+            #identity layers pass the pre-activation on as their activation
+            if interval is None:
+                pre_activations = plane
+                activations = 0 if identity else plane
+            else:
+                pre_activations = 0
+                activations = plane if (i+1) % interval == 0 or i == last else 0
+
+            #the normalized input is kept for backward, a workspace also keeps the affine step before normalization
+            if self.batch_norm[i]:
+                pre_activations += 2*plane if workspace else plane
+
+            #a workspace holds the activation gradient and the gradient flowing into the layer
+            temporaries = (plane if identity else 2*plane) if workspace else 0
+
+            #largest single temporary: the variance of a normalization, the softmax's recomputation and product in backward,
+            #and without a workspace the gradients created in backward
+            transient = 0
+            if self.batch_norm[i]:
+                transient = plane if workspace else 2*plane
+            if softmax_backward:
+                transient = max(transient, 2*plane)
+            if not workspace:
+                below = rows * widths[i-1] * itemsize if i > 0 else 0
+                incoming = 0 if i == last and fused_output else plane
+                delta = 0 if identity else plane
+                transient = max(transient, incoming + delta + (2*plane if softmax_backward else 0), plane + below)
+
+            #batch-sized arrays of the layer, as a Workspace allocates them
+            planes.append((pre_activations + activations + temporaries) // plane)
+
+            layers.append({
+                "layer": i+1,
+                "weights": weights,
+                "gradients": trainable,
+                "optimizer": slots * trainable,
+                "activations": activations,
+                "pre_activations": pre_activations,
+                "temporaries": temporaries,
+                "transient": transient,
+            })
+
+        #a recomputed segment rebuilds the pre-activations of its layers and the activations in between during backward
+        recomputed = 0
+        if interval is not None:
+            for start in range(0, last+1, interval):
+                segment = range(start, min(start+interval, last+1))
+                recomputed = max(recomputed, sum(rows * widths[i] * itemsize * (1 if i == segment[-1] or self.activations[i] == "identity" else 2) for i in segment))
+
+        #the batch itself (a shuffled batch is a copy) and the loss: t*log(y) or (y-t)**2, two output-sized arrays
+        inputs = rows * (self.w_layers[0].shape[0] + widths[last]) * itemsize
+        loss = 2 * rows * widths[last] * itemsize
+
+        report = {"batch_size": batch_size, "rows": rows, "dtype": str(self.dtype), "layers": layers}
+
+        for key in ("weights", "gradients", "optimizer", "activations", "pre_activations", "temporaries"):
+            report[key] = sum(layer[key] for layer in layers)
+
+        report["inputs"] = inputs
+        report["loss"] = loss
+        report["recompute"] = recomputed
+        #the next shuffled batch is gathered while the current one is still referenced
+        report["transient"] = max([loss, inputs] + [layer["transient"] for layer in layers]) + recomputed
+
+        #'get_workspace' keeps the workspace of the last, smaller batch of an epoch next to the full-size one
+        report["last_batch_workspace"] = 0
+        if workspace and n_inputs is not None and n_inputs % batch_size != 0:
+            last_rows = (n_inputs % batch_size) * self.input_shape[0]
+            report["last_batch_workspace"] = sum(w.nbytes + last_rows * w.shape[1] * itemsize * count for w, count in zip(self.w_layers, planes))
+
+        for layer in layers:
+            layer["total"] = sum(layer[key] for key in ("weights", "gradients", "optimizer", "activations", "pre_activations", "temporaries", "transient"))
+
+        report["total"] = sum(report[key] for key in ("weights", "gradients", "optimizer", "activations", "pre_activations", "temporaries", "inputs", "transient", "last_batch_workspace"))
+
+        return report
+
+    def auto_batch_size(self, memory_budget, workspace=True, recompute=None, optimizer=None, n_inputs=None):
+
+        #the largest batch size whose 'memory_report' total fits in 'memory_budget' (bytes, or a string such as "512MiB" or "2GB"),
+        #at most 'n_inputs' when it is given
+
+        budget = parse_bytes(memory_budget)
+
+        def fits(batch_size):
+            return self.memory_report(batch_size, workspace, recompute, optimizer, n_inputs)["total"] <= budget
+
+        if not fits(1):
+            raise Exception(f"a batch of 1 input needs {str(self.memory_report(1, workspace, recompute, optimizer, n_inputs)['total'])} bytes, more than the memory budget of {str(budget)} bytes")
+
+        if n_inputs is not None and fits(n_inputs):
+            return n_inputs
+
+        #memory grows about linearly with the batch size: double until the budget is exceeded, then bisect
+        low, high = 1, 2
+        while n_inputs is None or high < n_inputs:
+            if not fits(high):
+                break
+            low, high = high, high*2
+
+        if n_inputs is not None:
+            high = min(high, n_inputs)
+
+        while high - low > 1:
+            middle = (low + high) // 2
+            if fits(middle):
+                low = middle
+            else:
+                high = middle
+
+        return low
+
+
+    #util: mini-batch training
+    
+    def epoch_batches(self, x, t, batch_size, epochs, shuffle=True):
+        
+        #yields (x, t) mini-batches for 'epochs' passes, endlessly if 'epochs' is None
+        #without 'batch_size' every mini-batch is the full batch
+        
+        if batch_size is None and t is not None and not isinstance(x, Dataset):
+            batch_size = (x.shape[0] if is_sparse(x) else np.shape(x)[0]) // self.input_shape[0]
+        
+        epoch = 0
+        while epochs is None or epoch < epochs:
+            
+            empty_epoch = True
+            
+            if isinstance(x, Dataset):
+                batches = x.batches(batch_size, self.input_shape[0], shuffle)
+            elif t is None:
+                batches = x
+            else:
+                batches = batch_generator(x, t, batch_size, self.input_shape[0], shuffle)
+            
+            for x_batch, t_batch in batches:
+                empty_epoch = False
+                yield x_batch, t_batch
+            
+            #an exhausted generator cannot be iterated for another epoch
+            if empty_epoch:
+                return
+            
+            epoch += 1
+    
+    def count_steps(self, x, t, iteration, batch_size, epochs):
+        
+        #returns the number of update steps of a train session, or None if it cannot be known in advance
+        
+        steps_per_epoch = None
+        
+        if batch_size is None and epochs is None and t is not None:
+            return iteration
+        
+        elif isinstance(x, Dataset):
+            steps_per_epoch = -(-x.count_inputs(self.input_shape[0]) // batch_size)
+        
+        elif t is None:
+            try:
+                steps_per_epoch = len(x)
+            except TypeError:
+                pass
+        
+        else:
+            rows = x.shape[0] if is_sparse(x) else np.shape(x)[0]
+            if batch_size is None:
+                batch_size = rows // self.input_shape[0]
+            steps_per_epoch = -(-(rows // self.input_shape[0]) // batch_size)
+        
+        if steps_per_epoch is None or epochs is None:
+            return iteration
+        
+        if iteration is None:
+            return steps_per_epoch * epochs
+        
+        return min(iteration, steps_per_epoch * epochs)
+    
+    def display_progress(self, i, total_steps, error, error_round):
+        
+        if total_steps is None:
+            print(f"process                          step: {str(i+1)} error: {str(round(error, error_round))}", end="\r", flush=(i == 0))
+            return
+        
+        #one '=' per 5% of the session
+        k = 0
+        while k < 19 and i >= (k+1)*0.5*total_steps/10:
+            k += 1
+        
+        print(f"process {'='*k:<20} {str(5*k)}%  step: {str(i+1)} error: {str(round(error, error_round))}", end="\r", flush=(k == 0))
+        
+        return
+    
+    
+    
+    #활성화 함수 정의
+    #every kernel takes an optional 'out' buffer of the result's shape, so that a training workspace can be reused across steps
+
+    def sigmoid_forward(self, x, out=None):
+        
+        if out is None:
+            out = np.empty(np.shape(x), dtype=np.result_type(x, np.float16))
+        
+        #1/(1+exp(-x)), evaluated in place
+        np.negative(x, out=out)
+        np.exp(out, out=out)
+        out += 1
+        np.reciprocal(out, out=out)
+        
+        return out
+    
+    def sigmoid_backward(self, ret_x, ret_y, propagation, out=None):
+        #np.exp(-ret_x)*(ret_y**2)*propagation
+        
+        out = np.subtract(1, ret_y, out=out)
+        out *= ret_y
+        out *= propagation
+        
+        return out
+
+    def relu_forward(self, x, out=None):
+        return np.maximum(0, x, out=out)
+    
+    def relu_backward(self, ret_x, propagation, out=None):
+        
+        out = np.maximum(ret_x, 0, out=out)
+        out *= propagation
+        
+        return out
+
+    def softmax(self, x):
+        return np.exp(x - np.max(x))/np.sum(np.exp(x - np.max(x)))
+    
+    def softmax_individual(self, x, i):   #when x is a flattened numpy array or matrix, returns the softmax value of x[i]
+        
+        if type(x) == np.ndarray:
+            return np.exp(x[i] - np.max(x))/np.sum(np.exp(x - np.max(x)))
+        
+        elif type(x) == np.matrix:
+            return np.exp(x[0, i] - np.max(x))/np.sum(np.exp(x - np.max(x)))
+        
+        else:
+            raise Exception("unsupported argument type: takes numpy array or matrix")
+    
+    def softmax_forward(self, x, batch_size, out=None):
+
+        temp_x = np.asarray(x).reshape(batch_size, -1)  #batch 내의 각 input을 단위로 softmax를 수행하기 위해 reshape를 수행
+        
+        if out is None:
+            out = np.empty(np.shape(x), dtype=temp_x.dtype)
+        
+        temp_exp = out.reshape(batch_size, -1)
+
+        #row-wise stable softmax over the whole batch at once
+        np.subtract(temp_x, np.max(temp_x, axis=1, keepdims=True), out=temp_exp)
+        np.exp(temp_exp, out=temp_exp)
+        temp_exp /= np.sum(temp_exp, axis=1, keepdims=True)
+
+        return out   #원래 형상으로 복귀하여 전달
+
+    def softmax_backward(self, ret_x, propagation, batch_size, out=None):
+
+        temp_s = self.softmax_forward(ret_x, batch_size).reshape(batch_size, -1)  #batch 내의 각 input을 단위로 softmax를 수행하기 위해 reshape를 수행
+        temp_prop = np.asarray(propagation).reshape(batch_size, -1)
+        
+        if out is None:
+            out = np.empty(np.shape(ret_x), dtype=temp_s.dtype)
+        
+        temp_grads = out.reshape(batch_size, -1)
+
+        #jacobian-vector product s*(g - sum(s*g)), the jacobian itself is never materialized
+        np.subtract(temp_prop, np.sum(temp_s*temp_prop, axis=1, keepdims=True), out=temp_grads)
+        temp_grads *= temp_s
+
+        return out
+                
+            
+    def identity_forward(self, x, out=None):
+        return x
+    
+    def identity_backward(self, ret_x, propagation, out=None):
+        #the derivative is 1, so the propagation passes through unchanged
+        return propagation
+
+
+    #손실 함수 정의: y는 forward의 최종 output, t는 정답
+
+    def mean_square_forward(self, y, t):
+        return 0.5*np.sum((y-t)**2)
+
+    def mean_square_backward(self, y, t, out=None):
+        return np.subtract(y, t, out=out)
+    
+    def cross_entropy(self, y, t):
+        y[y==0] = y[y==0] + self.delta
+        return -np.sum(t*np.log(y))
+    
+    def cross_entropy_forward(self, y, t, batch_size):   
+        return self.cross_entropy(y, t)/batch_size
+        
+    def cross_entropy_backward(self, y, t, out=None):
+        y[y==0] = y[y==0] + self.delta
+        
+        #-t/y
+        out = np.divide(t, y, out=out)
+        np.negative(out, out=out)
+        
+        return out
+
+    
+    #affine 연산 함수
+
+    def affine_forward(self, x, w, b, out=None):
+        
+        if type(x) is np.ndarray or not is_sparse(x):
+            out = np.dot(x, w, out=out)
+        
+        #sparse-dense product, only the first layer sees a sparse input
+        elif out is None:
+            out = x @ w
+        else:
+            np.copyto(out, x @ w)
+        
+        out += b
+        
+        return out
+
+    def affine_backward(self, ret_x, ret_w, propagation, x_out=None, w_out=None, x_gradient=True):
+        
+        #the input gradient can be skipped for the first layer, where nothing consumes it
+        if x_gradient:
+            x_gradient = np.dot(propagation, ret_w.T, out=x_out)
+        else:
+            x_gradient = None
+        
+        if type(ret_x) is np.ndarray or not is_sparse(ret_x):
+            w_gradient = np.dot(ret_x.T, propagation, out=w_out)
+        
+        #sparse-transpose product, only the rows' nonzeros contribute to the first layer's gradient
+        elif w_out is None:
+            w_gradient = ret_x.T @ propagation
+        else:
+            w_gradient = w_out
+            np.copyto(w_gradient, ret_x.T @ propagation)
+        
+        b_gradient = np.sum(propagation)
+    
+        return x_gradient, w_gradient, b_gradient
+    
+    def batch_normalize_forward(self, i, x, update_stats=True, out=None, normalized_out=None):
+        
+        #per-feature normalization over the rows of the batch, then scale 'gammas[i]' and shift 'betas[i]'
+        
+        mean = np.mean(x, axis=0)
+        var = np.var(x, axis=0)
+        inverse_std = 1 / np.sqrt(var + self.bn_epsilon)
+        
+        x_hat = np.subtract(x, mean, out=normalized_out)
+        x_hat *= inverse_std
+        
+        out = np.multiply(x_hat, self.gammas[i], out=out)
+        out += self.betas[i]
+        
+        #kept for backward
+        self.bn_caches[i] = (x_hat, inverse_std)
+        
+        #running statistics use the unbiased batch variance
+        if update_stats:
+            rows = x.shape[0]
+            self.running_means[i] *= self.bn_momentum
+            self.running_means[i] += (1 - self.bn_momentum) * mean
+            self.running_vars[i] *= self.bn_momentum
+            self.running_vars[i] += (1 - self.bn_momentum) * var * (rows / max(rows - 1, 1))
+        
+        return out
+    
+    def batch_normalize_backward(self, i, propagation):
+        
+        #fills 'gamma_gradients[i]' and 'beta_gradients[i]', returns the gradient of the normalized layer's input
+        #'propagation' and the cached normalized input are overwritten, neither is needed afterwards
+        #dx = gamma * inverse_std * (dy - mean(dy) - x_hat * mean(dy * x_hat))
+        
+        x_hat, inverse_std = self.bn_caches[i]
+        rows = propagation.shape[0]
+        
+        self.beta_gradients[i] = np.sum(propagation, axis=0)
+        self.gamma_gradients[i] = np.einsum("ij,ij->j", propagation, x_hat)
+        
+        x_hat *= self.gamma_gradients[i] / rows
+        propagation -= self.beta_gradients[i] / rows
+        propagation -= x_hat
+        propagation *= self.gammas[i] * inverse_std
+        
+        self.bn_caches[i] = None
+        
+        return propagation
+    
+    def inference_layers(self):
+        
+        #(weights, biases) used for prediction, with batch normalization folded into the affine step of its layer:
+        #  w' = w * scale, b' = (b - running_mean) * scale + beta, where scale = gamma / sqrt(running_var + epsilon)
+        #folded biases are vectors, the result is cached until the parameters change
+        
+        if not any(self.batch_norm):
+            return self.w_layers, self.b_layers
+        
+        if self.folded is None:
+            
+            w_layers, b_layers = [], []
+            
+            for i in range(len(self.w_layers)):
+                if self.batch_norm[i]:
+                    scale = self.gammas[i] / np.sqrt(self.running_vars[i] + self.bn_epsilon)
+                    w_layers.append(self.w_layers[i] * scale)
+                    b_layers.append((self.b_layers[i] - self.running_means[i]) * scale + self.betas[i])
+                else:
+                    w_layers.append(self.w_layers[i])
+                    b_layers.append(self.b_layers[i])
+            
+            self.folded = (w_layers, b_layers)
+        
+        return self.folded
+    
+    def init_batch_norm(self, batch_norm, momentum=0.9, epsilon=1e-5):
+        
+        #'batch_norm' is True for every layer but the output layer, False, or one flag per layer
+        
+        layers = len(self.structure)
+        
+        if batch_norm is True:
+            flags = [i < layers-1 for i in range(layers)]
+        elif batch_norm is False or batch_norm is None:
+            flags = [False]*layers
+        else:
+            flags = [bool(flag) for flag in batch_norm]
+            if len(flags) != layers:
+                raise Exception("'batch_norm' must be True, False or one flag per layer")
+        
+        self.batch_norm = flags
+        self.bn_momentum = momentum
+        self.bn_epsilon = epsilon
+        
+        #scale and shift start as the identity, running statistics as a standard normal
+        self.gammas = [np.ones(self.structure[i], dtype=self.dtype) if flags[i] else None for i in range(layers)]
+        self.betas = [np.zeros(self.structure[i], dtype=self.dtype) if flags[i] else None for i in range(layers)]
+        self.running_means = [np.zeros(self.structure[i], dtype=self.dtype) if flags[i] else None for i in range(layers)]
+        self.running_vars = [np.ones(self.structure[i], dtype=self.dtype) if flags[i] else None for i in range(layers)]
+        
+        self.gamma_gradients = [None]*layers
+        self.beta_gradients = [None]*layers
+        self.bn_caches = [None]*layers
+        self.folded = None
+        
+        return
+    
+    def parameter_arrays(self):
+        
+        #every array that training changes in place: weights, then scales, shifts and running statistics of normalized layers
+        
+        arrays = list(self.w_layers)
+        
+        for i in range(len(self.w_layers)):
+            if self.batch_norm[i]:
+                arrays += [self.gammas[i], self.betas[i], self.running_means[i], self.running_vars[i]]
+        
+        return arrays
+    
+    
+    #util: export
+    
+    def check_include(self, include):
+
+        compat_include_params = {"all", "essential", "error_log", "gradients", "fan_io", "optimizer", "quantized"}
 
         #check validity for 'include' param
         if type(include) == str:
@@ -723,6 +1738,26 @@ class ANN():
                     raise Exception("compatible parameters for 'include' argement are: " + str(compat_include_params))
         else:
             raise Exception("compatible parameters for 'include' argement are: " + str(compat_include_params))
+
+        return
+
+    def check_quantized(self, include):
+
+        #whether the quantized predictor is exported, 'all' includes it only when there is one
+
+        if "quantized" in include:
+            if self.quantized is None:
+                raise Exception("the model is not quantized, call 'quantize' first")
+            #without float weights a normalized layer could not be rebuilt, only its folded form is quantized
+            if any(self.batch_norm) and "all" not in include and "essential" not in include:
+                raise Exception("a model with batch normalization exports its quantized form along with 'essential' only")
+            return True
+
+        return "all" in include and self.quantized is not None
+
+    def export(self, directory= r".\\", file_name= None, include= "essential"):
+
+        self.check_include(include)
         
         #initialize 'file_name'
         if file_name == None:
@@ -733,9 +1768,11 @@ class ANN():
             raise Exception("'file_name' must end with '.json'")
 
         model_json = {}
+        
+        quantized = self.check_quantized(include)
 
-        #essential export
-        if "all" in include or "essential" in include:
+        #essential export, a quantized export keeps the architecture but replaces the float weights with int8 ones
+        if "all" in include or "essential" in include or "quantized" in include:
             model_json["input_shape"] = self.input_shape
             model_json["structure"] = self.structure
             model_json["strict"] = self.strict
@@ -744,19 +1781,46 @@ class ANN():
             model_json["loss"] = self.loss
             model_json["activations"] = self.activations
             model_json["delta"] = self.delta
+            model_json["dtype"] = self.dtype.name
+        
+            model_json["b_layers"] = [float(b) for b in self.b_layers]
+        
+        if "all" in include or "essential" in include:
         
             temp= []
             for i in range(len(self.structure)):
                 temp.append(self.w_layers[i].tolist())
         
             model_json["w_layers"] = temp
-            model_json["b_layers"] = self.b_layers
+            
+            #pruning masks are stored as bits, 8 weights per byte
+            if self.masks is not None:
+                model_json["masks"] = [np.packbits(mask).tolist() for mask in self.masks]
+            
+            #batch normalization, one entry per layer, None for layers without it
+            if any(self.batch_norm):
+                model_json["batch_norm"] = self.batch_norm
+                model_json["bn_momentum"] = self.bn_momentum
+                model_json["bn_epsilon"] = self.bn_epsilon
+                for name in ("gammas", "betas", "running_means", "running_vars"):
+                    model_json[name] = [None if array is None else array.tolist() for array in getattr(self, name)]
+        
+        #int8 weights are stored as base64 of their raw bytes, about 1.3 characters per weight
+        if quantized:
+            
+            meta, arrays = self.quantized.state()
+            
+            model_json["quantized"] = meta
+            model_json["quantized"]["w_layers"] = [base64.b64encode(q.tobytes()).decode("ascii") for q in arrays["w_layers"]]
+            model_json["quantized"]["w_shapes"] = [list(q.shape) for q in arrays["w_layers"]]
+            model_json["quantized"]["w_scales"] = [scale.tolist() for scale in arrays["w_scales"]]
+            model_json["quantized"]["b_layers"] = [b.tolist() for b in arrays["b_layers"]]
         
         #optional export
         if "all" in include or "error_log" in include:
 
             try:
-                model_json["error_log"] = self.error_log
+                model_json["error_log"] = [float(error) for error in self.error_log]
             
             except Exception as e:
                 pass
@@ -788,7 +1852,8 @@ class ANN():
             try:
                 temp=[]
                 for i in range(len(self.structure)):
-                    temp.append(self.fan_ins[i].tolist())
+                    fan_in = self.fan_ins[i].toarray() if is_sparse(self.fan_ins[i]) else self.fan_ins[i]
+                    temp.append(fan_in.tolist())
 
                 model_json["fan_ins"] = temp
             
@@ -805,6 +1870,13 @@ class ANN():
             except Exception as e:
                 pass
         
+        if ("all" in include or "optimizer" in include) and self.optimizer is not None:
+            
+            meta, buffers = self.optimizer.state()
+            
+            model_json["optimizer"] = meta
+            model_json["optimizer_buffers"] = {name: [buffer.tolist() for buffer in buffers[name]] for name in buffers}
+        
         #export as json file
         with open(directory + "\\" + file_name, "w") as f:
             json.dump(model_json, f)
@@ -813,6 +1885,101 @@ class ANN():
         
         return
 
+    def export_binary(self, directory= ".", file_name= None, include= "essential"):
+
+        #same contents as 'export', but arrays are written raw and aligned so 'make' can map them without copying
+
+        self.check_include(include)
+
+        #initialize 'file_name'
+        if file_name == None:
+            file_name = "model_" + str(time.localtime().tm_mon) + str(time.localtime().tm_mday) + "-" + str(time.localtime().tm_hour) + str(time.localtime().tm_min) + ".sdv"
+
+        #check validity for 'file_name' param
+        if not file_name.endswith(".sdv"):
+            raise Exception("'file_name' must end with '.sdv'")
+
+        fields, sections = self.binary_contents(include)
+
+        binary.write(os.path.join(directory, file_name), fields, sections)
+
+        print(f"model export successful: '{os.path.join(directory, file_name)}'")
+
+        return
+
+    def binary_contents(self, include= "essential"):
+
+        #(fields, sections) written by 'export_binary', arrays in 'sections' are the model's own arrays, not copies
+
+        self.check_include(include)
+
+        fields = {}
+        sections = {}
+
+        quantized = self.check_quantized(include)
+
+        #essential export, a quantized export keeps the architecture but replaces the float weights with int8 ones
+        if "all" in include or "essential" in include or "quantized" in include:
+            fields["input_shape"] = list(self.input_shape)
+            fields["structure"] = list(self.structure)
+            fields["strict"] = self.strict
+            fields["initializer"] = self.initializer
+            fields["output"] = self.output
+            fields["loss"] = self.loss
+            fields["activations"] = list(self.activations)
+            fields["delta"] = self.delta
+            fields["dtype"] = self.dtype.name
+
+            sections["b_layers"] = [np.array(self.b_layers)]
+
+        if "all" in include or "essential" in include:
+
+            sections["w_layers"] = self.w_layers[:len(self.structure)]
+
+            if self.masks is not None:
+                sections["masks"] = [np.packbits(mask) for mask in self.masks]
+
+            #batch normalization arrays of the normalized layers only, in layer order
+            if any(self.batch_norm):
+                fields["batch_norm"] = list(self.batch_norm)
+                fields["bn_momentum"] = self.bn_momentum
+                fields["bn_epsilon"] = self.bn_epsilon
+                for name in ("gammas", "betas", "running_means", "running_vars"):
+                    sections["bn." + name] = [array for array in getattr(self, name) if array is not None]
+
+        if quantized:
+
+            meta, arrays = self.quantized.state()
+
+            fields["quantized"] = meta
+            sections["quantized.w_layers"] = arrays["w_layers"]
+            sections["quantized.w_scales"] = arrays["w_scales"]
+            sections["quantized.b_layers"] = arrays["b_layers"]
+
+        #optional export
+        if ("all" in include or "error_log" in include) and len(self.error_log) > 0:
+            sections["error_log"] = [np.array(self.error_log)]
+
+        if ("all" in include or "gradients" in include) and len(self.w_gradients) >= len(self.structure):
+            sections["w_gradients"] = self.w_gradients[:len(self.structure)]
+            sections["b_gradients"] = [np.array(self.b_gradients)]
+
+        #a recomputed session releases the fan-ins and fan-outs of its segments, they are exported only when all of them are kept
+        fan_ios = self.fan_ins[:len(self.structure)] + self.fan_outs[:len(self.structure)]
+        if ("all" in include or "fan_io" in include) and len(self.fan_outs) >= len(self.structure) and all(fan_io is not None for fan_io in fan_ios):
+            sections["fan_ins"] = [fan_in.toarray() if is_sparse(fan_in) else np.asarray(fan_in) for fan_in in self.fan_ins[:len(self.structure)]]
+            sections["fan_outs"] = [np.asarray(fan_out) for fan_out in self.fan_outs[:len(self.structure)]]
+
+        if ("all" in include or "optimizer" in include) and self.optimizer is not None:
+
+            meta, buffers = self.optimizer.state()
+
+            fields["optimizer"] = meta
+            for name in buffers:
+                sections["optimizer." + name] = buffers[name]
+
+        return fields, sections
+
     #util: visualizer
 
     def vis_error_log(self):
@@ -826,9 +1993,97 @@ class ANN():
         return
 
 
+#util: preallocated buffers for forward and backward propagation of one batch shape
+
+class Workspace():
+    
+    def __init__(self, model, rows):
+        
+        self.rows = rows
+        self.dtype = model.dtype
+        self.shapes = [w.shape for w in model.w_layers]
+        self.activations = list(model.activations)
+        
+        layers = range(len(model.w_layers))
+        widths = [w.shape[1] for w in model.w_layers]
+        
+        #forward: pre-activations and activations, fan_ins[0] is the batch itself
+        self.fan_outs = [np.empty((rows, widths[i]), dtype=self.dtype) for i in layers]
+        self.fan_ins = [None]*(len(model.w_layers)+1)
+        
+        #identity layers pass their input through and need no buffer of their own
+        self.activation_outs = [None if model.activations[i] == "identity" else np.empty((rows, widths[i]), dtype=self.dtype) for i in layers]
+        self.deltas = [None if model.activations[i] == "identity" else np.empty((rows, widths[i]), dtype=self.dtype) for i in layers]
+        
+        #normalized layers: the affine step before normalization and the normalized input kept for backward
+        self.batch_norm = list(model.batch_norm)
+        self.pre_norms = [np.empty((rows, widths[i]), dtype=self.dtype) if model.batch_norm[i] else None for i in layers]
+        self.normalized = [np.empty((rows, widths[i]), dtype=self.dtype) if model.batch_norm[i] else None for i in layers]
+        
+        #backward: gradient flowing into the output of each layer, and parameter gradients
+        self.propagations = [np.empty((rows, widths[i]), dtype=self.dtype) for i in layers]
+        self.w_gradients = [np.empty(w.shape, dtype=self.dtype) for w in model.w_layers]
+        self.b_gradients = [None]*len(model.w_layers)
+        
+        return
+    
+    def fits(self, model):
+        return self.dtype == model.dtype and self.shapes == [w.shape for w in model.w_layers] and self.activations == list(model.activations) and self.batch_norm == list(model.batch_norm)
+    
+    def nbytes(self):
+        
+        total = 0
+        for buffers in (self.fan_outs, self.activation_outs, self.pre_norms, self.normalized, self.deltas, self.propagations, self.w_gradients):
+            total += sum(buffer.nbytes for buffer in buffers if buffer is not None)
+        
+        return total
+
+
+#util: mini-batch generator
+
+def batch_generator(x, t, batch_size, group=1, shuffle=True):
+    
+    #yields (x, t) mini-batches of 'batch_size' inputs, where one input spans 'group' rows
+    #shuffling permutes indexes only, so the full dataset is never copied
+    
+    if not hasattr(x, "shape"):
+        x = np.asarray(x)
+    if not hasattr(t, "shape"):
+        t = np.asarray(t)
+    
+    if x.shape[0] != t.shape[0]:
+        raise Exception("'x' and 't' must have the same number of rows")
+    
+    if x.shape[0] % group != 0:
+        raise Exception("size of a mini-batch must be a multiple of specified input size of the model object")
+    
+    if batch_size < 1:
+        raise Exception("'batch_size' must be a positive integer")
+    
+    n_inputs = x.shape[0] // group
+    
+    if shuffle:
+        order = np.random.permutation(n_inputs)
+    
+    for start in range(0, n_inputs, batch_size):
+        
+        if shuffle:
+            index = order[start:start+batch_size]
+            if group != 1:
+                index = (index[:, np.newaxis]*group + np.arange(group)).ravel()
+            yield x[index], t[index]
+            
+        else:
+            yield x[start*group:(start+batch_size)*group], t[start*group:(start+batch_size)*group]
+
+
 #util: create a model from a json file
 
-def make(io):
+def make(io, mmap=True):
+    
+    #binary files written by 'export_binary' are recognized by their magic number, anything else is read as json
+    if binary.is_binary(io):
+        return make_binary(io, mmap)
         
     with open(io, "r") as f:
         model_json = json.load(f)
@@ -848,13 +2103,32 @@ def make(io):
         model.loss = model_json["loss"]
         model.activations = model_json["activations"]
         model.delta = model_json["delta"]
+        model.dtype = np.dtype(model_json.get("dtype", "float64"))
+        
+        model.b_layers = [model.dtype.type(b) for b in model_json["b_layers"]]
+        
+        model.init_batch_norm(model_json.get("batch_norm", False), model_json.get("bn_momentum", 0.9), model_json.get("bn_epsilon", 1e-5))
+        for name in ("gammas", "betas", "running_means", "running_vars"):
+            if name in model_json:
+                setattr(model, name, [None if array is None else np.array(array, dtype=model.dtype) for array in model_json[name]])
+        
+        #a quantized export has no float weights, the model gets the dequantized int8 ones instead
+        if "quantized" in model_json:
+            quantized = model_json["quantized"]
+            q_layers = [np.frombuffer(base64.b64decode(q), dtype=np.int8).reshape(shape) for q, shape in zip(quantized["w_layers"], quantized["w_shapes"])]
+            q_biases = [np.array(b) for b in quantized["b_layers"]] if "b_layers" in quantized else model.b_layers
+            model.quantized = inference.QuantizedPlan(model.input_shape, q_layers, quantized["w_scales"], quantized["x_scales"], q_biases, model.activations, quantized["max_batch"])
+            model.w_layers = [w.astype(model.dtype) for w in model.quantized.dequantize()]
+        
+        if "w_layers" in model_json:
+            temp = []
+            for i in range(len(model.structure)):
+                temp.append(np.array(model_json["w_layers"][i], dtype=model.dtype))
+            
+            model.w_layers = temp
         
-        temp = []
-        for i in range(len(model.structure)):
-            temp.append(np.array(model_json["w_layers"][i]))
-        
-        model.w_layers = temp
-        model.b_layers = model_json["b_layers"]
+        if "masks" in model_json:
+            model.masks = unpack_masks([np.array(mask, dtype=np.uint8) for mask in model_json["masks"]], model.w_layers)
     except Exception as e:
         pass
         
@@ -868,7 +2142,7 @@ def make(io):
     try:
         temp = []
         for i in range(len(model.structure)):
-            temp.append(np.array(model_json["w_gradients"][i]))
+            temp.append(np.array(model_json["w_gradients"][i], dtype=model.dtype))
             
         model.w_gradients = temp
             
@@ -878,7 +2152,7 @@ def make(io):
     try:
         temp = []
         for i in range(len(model.structure)):
-            temp.append(np.array(model_json["b_gradients"][i]))
+            temp.append(np.array(model_json["b_gradients"][i], dtype=model.dtype))
             
         model.b_gradients = temp
             
@@ -888,7 +2162,7 @@ def make(io):
     try:
         temp = []
         for i in range(len(model.structure)):
-            temp.append(np.array(model_json["fan_ins"][i]))
+            temp.append(np.array(model_json["fan_ins"][i], dtype=model.dtype))
             
         model.fan_ins = temp
             
@@ -898,61 +2172,120 @@ def make(io):
     try:
         temp = []
         for i in range(len(model.structure)):
-            temp.append(np.array(model_json["fan_outs"][i]))
+            temp.append(np.array(model_json["fan_outs"][i], dtype=model.dtype))
             
         model.fan_outs = temp
             
     except Exception as e:
         pass
+    
+    if "optimizer" in model_json:
+        model.optimizer = optim.load(model_json["optimizer"], model_json["optimizer_buffers"], model.dtype)
         
     return model
 
 
-#util: visualizer
+#util: create a model from a binary file, weights are mapped from the file instead of being copied
 
-def visualize_error_log(error_log):
+def make_binary(io, mmap=True):
 
-    mpl.rc('xtick', color = '#4A4A4A', labelsize = 12)
-    mpl.rc('ytick', color = '#4A4A4A', labelsize = 12)
-    mpl.rc('lines', linewidth = 1.5, markeredgewidth = 0)
-    mpl.rc('axes', labelsize= 18, titlesize = 30, titlepad=40, labelpad = 17)
-    mpl.rc('axes.spines', left=False, right=False, top=False, bottom = False)
+    fields, sections = binary.read(io, mmap)
 
-    fig = plt.figure(figsize = (20, 10))
-    plt.plot(error_log, color="#00ACCD")
-    plt.xlabel('Step')
-    plt.ylabel('Error')
-    plt.grid(True, color='#00ACCD', alpha=0.2, linestyle='--')
+    #create a default model
 
-    plt.show()
+    model = ANN((1,1), (1, 1), "sigmoid")
 
-    return
-  
-def visualize_fanio_dist(fan_ins, fan_outs):
+    #essential imports
 
-    mpl.rc('xtick', color = '#4A4A4A', labelsize = 12)
-    mpl.rc('ytick', color = '#4A4A4A', labelsize = 12)
-    mpl.rc('lines', linewidth = 1.5, markeredgewidth = 0)
-    mpl.rc('axes', labelsize= 14, titlesize = 30, titlepad=40, labelpad = 17)
-    mpl.rc('axes.spines', left=False, right=False, top=False, bottom = False)
-    mpl.rc('figure', titlesize = 20, figsize = (20, 7))
+    if "b_layers" in sections:
+        model.input_shape = fields["input_shape"]
+        model.structure = fields["structure"]
+        model.strict = fields["strict"]
+        model.initializer = fields["initializer"]
+        model.output = fields["output"]
+        model.loss = fields["loss"]
+        model.activations = fields["activations"]
+        model.delta = fields["delta"]
+        model.dtype = np.dtype(fields.get("dtype", "float64"))
+
+        model.b_layers = list(sections["b_layers"][0])
+
+        model.init_batch_norm(fields.get("batch_norm", False), fields.get("bn_momentum", 0.9), fields.get("bn_epsilon", 1e-5))
+        for name in ("gammas", "betas", "running_means", "running_vars"):
+            if "bn." + name in sections:
+                arrays = iter(sections["bn." + name])
+                setattr(model, name, [next(arrays) if flag else None for flag in model.batch_norm])
+
+    #a quantized export has no float weights, the model gets the dequantized int8 ones instead
+    if "quantized" in fields:
+        quantized = fields["quantized"]
+        q_biases = sections.get("quantized.b_layers", model.b_layers)
+        model.quantized = inference.QuantizedPlan(model.input_shape, sections["quantized.w_layers"], sections["quantized.w_scales"], quantized["x_scales"], q_biases, model.activations, quantized["max_batch"])
+        model.w_layers = [w.astype(model.dtype) for w in model.quantized.dequantize()]
+
+    if "w_layers" in sections:
+        model.w_layers = sections["w_layers"]
+
+        if "masks" in sections:
+            model.masks = unpack_masks(sections["masks"], model.w_layers)
 
-    fig1, fi_axes = plt.subplots(1, len(fan_ins)-1)
-    fig2, fo_axes = plt.subplots(1, len(fan_outs))
+    #optional import
+    if "error_log" in sections:
+        model.error_log = list(sections["error_log"][0])
 
-    fig1.suptitle("Actiavation Distributions")
-    fig2.suptitle("Fan Out Distributions")
+    if "w_gradients" in sections:
+        model.w_gradients = sections["w_gradients"]
+        model.b_gradients = list(sections["b_gradients"][0])
 
-    for i in range(len(fan_outs)):
+    if "fan_ins" in sections:
+        model.fan_ins = sections["fan_ins"]
+        model.fan_outs = sections["fan_outs"]
 
-        fi_axes[i].hist(fan_ins[i+1].reshape(1, -1)[0], bins=20, color="#00ACCD")
-        fi_axes[i].set_xlabel('Layer' + str(i+1))
-        fi_axes[i].grid(True, color='#00ACCD', alpha=0.2, linestyle='--')
+    if "optimizer" in fields:
+        buffers = {name[len("optimizer."):]: sections[name] for name in sections if name.startswith("optimizer.")}
+        model.optimizer = optim.load(fields["optimizer"], buffers, model.dtype)
+
+    return model
+
+
+def parse_bytes(size):
+    
+    #a number of bytes, or a string with a unit: "512MiB", "2GB", "1.5 GiB"
+    
+    if isinstance(size, str):
+        
+        units = {"b": 1, "kb": 10**3, "mb": 10**6, "gb": 10**9, "tb": 10**12, "kib": 2**10, "mib": 2**20, "gib": 2**30, "tib": 2**40}
+        number = size.strip().lower().rstrip("abcdefghijklmnopqrstuvwxyz")
+        unit = size.strip().lower()[len(number):]
+        
+        if unit not in units:
+            raise Exception("unknown memory unit in '" + size + "', use one of B, KB, MB, GB, TB, KiB, MiB, GiB, TiB")
+        
+        try:
+            size = float(number) * units[unit]
+        except ValueError:
+            raise Exception("invalid memory size: '" + size + "'")
+    
+    if size <= 0:
+        raise Exception("a memory size must be positive")
+    
+    return int(size)
 
-        fo_axes[i].hist(fan_outs[i].reshape(1, -1)[0], bins=20, color="#00ACCD")
-        fo_axes[i].set_xlabel('Layer' + str(i+1))
-        fo_axes[i].grid(True, color='#00ACCD', alpha=0.2, linestyle='--')
+def unpack_masks(packed, w_layers):
+    
+    #boolean pruning masks from their packed bits, shaped like the weights they belong to
     
-    plt.show()
+    return [np.unpackbits(bits, count=w.size).reshape(w.shape).astype(bool) for bits, w in zip(packed, w_layers)]
+
+
+#util: visualizer, matplotlib is only imported once a plot is requested
+
+def visualize_error_log(error_log):
+
+    from seadiver import visualize
+    return visualize.visualize_error_log(error_log)
+
+def visualize_fanio_dist(fan_ins, fan_outs):
 
-    return
\ No newline at end of file
+    from seadiver import visualize
+    return visualize.visualize_fanio_dist(fan_ins, fan_outs)
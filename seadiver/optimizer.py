@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import math
+
+
+#learning rate schedules: called with the 0-based step, they return a factor applied to the learning rate of 'train'
+
+class StepDecay():
+
+    def __init__(self, step_size, gamma=0.1):
+        self.step_size = step_size
+        self.gamma = gamma
+
+    def __call__(self, step):
+        return self.gamma ** (step // self.step_size)
+
+    def config(self):
+        return {"name": "step", "step_size": self.step_size, "gamma": self.gamma}
+
+class ExponentialDecay():
+
+    def __init__(self, gamma):
+        self.gamma = gamma
+
+    def __call__(self, step):
+        return self.gamma ** step
+
+    def config(self):
+        return {"name": "exponential", "gamma": self.gamma}
+
+class CosineDecay():
+
+    def __init__(self, total_steps, minimum=0.0):
+        self.total_steps = total_steps
+        self.minimum = minimum
+
+    def __call__(self, step):
+        progress = min(step, self.total_steps) / self.total_steps
+        return self.minimum + (1 - self.minimum) * 0.5 * (1 + math.cos(math.pi * progress))
+
+    def config(self):
+        return {"name": "cosine", "total_steps": self.total_steps, "minimum": self.minimum}
+
+schedules = {"step": StepDecay, "exponential": ExponentialDecay, "cosine": CosineDecay}
+
+
+#optimizers: every state buffer is allocated once per parameter and parameters are updated in place
+
+class Optimizer():
+
+    name = None
+    buffer_names = []
+
+    def __init__(self, schedule=None):
+
+        if schedule is not None and not callable(schedule):
+            raise Exception("'schedule' must be a callable taking the step number")
+
+        self.schedule = schedule
+        self.step_count = 0
+
+        #state buffers, one list of arrays per name in 'buffer_names'
+        self.buffers = {}
+
+        #scratch space, not part of the state
+        self.scratch = []
+
+        return
+
+    def config(self):
+        return {}
+
+    def rate(self, learning_rate):
+
+        if self.schedule is None:
+            return learning_rate
+
+        return learning_rate * self.schedule(self.step_count)
+
+    def prepare(self, params):
+
+        if len(self.buffers) == 0:
+            for name in self.buffer_names:
+                self.buffers[name] = [np.zeros_like(param) for param in params]
+
+        for name in self.buffer_names:
+            if len(self.buffers[name]) != len(params) or any(buffer.shape != np.shape(param) for buffer, param in zip(self.buffers[name], params)):
+                raise Exception("optimizer state does not match the model's parameters")
+
+        if len(self.scratch) != len(params):
+            self.scratch = [np.empty_like(param) for param in params]
+
+        return
+
+    def update(self, params, grads, learning_rate):
+
+        #'params' are ndarrays updated in place, 'grads' are the matching gradients
+        self.prepare(params)
+
+        rate = self.rate(learning_rate)
+
+        for i in range(len(params)):
+            self.update_param(i, params[i], grads[i], rate)
+
+        self.step_count += 1
+
+        return
+
+    def update_param(self, i, param, grad, rate):
+        raise NotImplementedError
+
+    def state(self):
+
+        #(meta, buffers): json-serializable description and the state arrays
+
+        meta = {"name": self.name, "config": self.config(), "step": self.step_count, "schedule": None}
+
+        if self.schedule is not None:
+            if not hasattr(self.schedule, "config"):
+                raise Exception("only schedules from seadiver.optimizer can be exported")
+            meta["schedule"] = self.schedule.config()
+
+        return meta, self.buffers
+
+
+class SGD(Optimizer):
+
+    name = "sgd"
+
+    def update_param(self, i, param, grad, rate):
+
+        temp = self.scratch[i]
+
+        np.multiply(grad, rate, out=temp)
+        param -= temp
+
+        return
+
+class Momentum(Optimizer):
+
+    name = "momentum"
+    buffer_names = ["velocity"]
+
+    def __init__(self, momentum=0.9, nesterov=False, schedule=None):
+
+        super().__init__(schedule)
+        self.momentum = momentum
+        self.nesterov = nesterov
+
+    def config(self):
+        return {"momentum": self.momentum, "nesterov": self.nesterov}
+
+    def update_param(self, i, param, grad, rate):
+
+        velocity = self.buffers["velocity"][i]
+        temp = self.scratch[i]
+
+        np.multiply(grad, rate, out=temp)
+
+        velocity *= self.momentum
+        velocity -= temp
+
+        if self.nesterov:
+            #look-ahead step: param += momentum*velocity - rate*grad
+            param -= temp
+            np.multiply(velocity, self.momentum, out=temp)
+            param += temp
+        else:
+            param += velocity
+
+        return
+
+class RMSProp(Optimizer):
+
+    name = "rmsprop"
+    buffer_names = ["square_average"]
+
+    def __init__(self, rho=0.9, epsilon=1e-7, schedule=None):
+
+        super().__init__(schedule)
+        self.rho = rho
+        self.epsilon = epsilon
+
+    def config(self):
+        return {"rho": self.rho, "epsilon": self.epsilon}
+
+    def update_param(self, i, param, grad, rate):
+
+        square_average = self.buffers["square_average"][i]
+        temp = self.scratch[i]
+
+        np.multiply(grad, grad, out=temp)
+        temp *= 1 - self.rho
+        square_average *= self.rho
+        square_average += temp
+
+        np.sqrt(square_average, out=temp)
+        temp += self.epsilon
+        np.divide(grad, temp, out=temp)
+        temp *= rate
+        param -= temp
+
+        return
+
+class Adam(Optimizer):
+
+    name = "adam"
+    buffer_names = ["first_moment", "second_moment"]
+
+    def __init__(self, beta1=0.9, beta2=0.999, epsilon=1e-7, schedule=None):
+
+        super().__init__(schedule)
+        self.beta1 = beta1
+        self.beta2 = beta2
+        self.epsilon = epsilon
+
+    def config(self):
+        return {"beta1": self.beta1, "beta2": self.beta2, "epsilon": self.epsilon}
+
+    def update_param(self, i, param, grad, rate):
+
+        first_moment = self.buffers["first_moment"][i]
+        second_moment = self.buffers["second_moment"][i]
+        temp = self.scratch[i]
+
+        step = self.step_count + 1
+
+        first_moment *= self.beta1
+        np.multiply(grad, 1 - self.beta1, out=temp)
+        first_moment += temp
+
+        second_moment *= self.beta2
+        np.multiply(grad, grad, out=temp)
+        temp *= 1 - self.beta2
+        second_moment += temp
+
+        #param -= rate * m_hat / (sqrt(v_hat) + epsilon)
+        np.divide(second_moment, 1 - self.beta2**step, out=temp)
+        np.sqrt(temp, out=temp)
+        temp += self.epsilon
+        np.divide(first_moment, temp, out=temp)
+        temp *= rate / (1 - self.beta1**step)
+        param -= temp
+
+        return
+
+optimizers = {"sgd": SGD, "momentum": Momentum, "rmsprop": RMSProp, "adam": Adam}
+
+
+#util: build optimizers from names and exported states
+
+def get(optimizer):
+
+    if isinstance(optimizer, Optimizer):
+        return optimizer
+
+    if optimizer == "nesterov":
+        return Momentum(nesterov=True)
+
+    if optimizer not in optimizers:
+        raise Exception("invalid optimizer name, compatible optimizers are: " + str(set(optimizers) | {"nesterov"}))
+
+    return optimizers[optimizer]()
+
+def load(meta, buffers, dtype=None):
+
+    if meta["name"] not in optimizers:
+        raise Exception("invalid optimizer name: " + str(meta["name"]))
+
+    schedule = None
+    if meta["schedule"] is not None:
+        schedule_config = dict(meta["schedule"])
+        schedule = schedules[schedule_config.pop("name")](**schedule_config)
+
+    optimizer = optimizers[meta["name"]](schedule=schedule, **meta["config"])
+    optimizer.step_count = meta["step"]
+
+    for name in optimizer.buffer_names:
+        if name in buffers:
+            optimizer.buffers[name] = [np.array(buffer, dtype=dtype) for buffer in buffers[name]]
+
+    return optimizer
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import copy
+import multiprocessing
+import traceback
+from multiprocessing import shared_memory
+
+
+#data-parallel training
+#
+#every batch is split into one shard per worker process, each worker runs forward/backward on its shard and
+#writes its gradients into its own slot of a shared memory block, which the parent sums in place
+#weights live in another shared memory block: the parent's optimizer updates them in place and the workers
+#read them directly, so neither gradients nor weights are ever pickled
+#
+#for best scaling, limit BLAS to one thread per worker (e.g. OMP_NUM_THREADS=1)
+
+
+def _create(shape, dtype):
+
+    nbytes = max(int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize, 1)
+    block = shared_memory.SharedMemory(create=True, size=nbytes)
+
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _attach(name, shape, dtype):
+
+    block = shared_memory.SharedMemory(name=name)
+
+    return block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _split(flat, shapes):
+
+    #views of weight matrices followed by the bias vector on one flat parameter buffer
+
+    views = []
+    offset = 0
+
+    for shape in shapes:
+        size = shape[0] * shape[1]
+        views.append(flat[offset:offset+size].reshape(shape))
+        offset += size
+
+    return views, flat[offset:offset+len(shapes)]
+
+def _parameter_count(shapes):
+    return sum(shape[0] * shape[1] for shape in shapes) + len(shapes)
+
+def _release(block):
+    block.close()
+    block.unlink()
+    return
+
+
+def _worker(conn, model, shapes, index, params_name, grads_name, n_workers):
+
+    n_params = _parameter_count(shapes)
+
+    blocks = []
+    data = None
+
+    try:
+        block, params = _attach(params_name, (n_params,), model.dtype)
+        blocks.append(block)
+        model.w_layers, b_view = _split(params, shapes)
+
+        block, grads = _attach(grads_name, (n_workers, n_params), model.dtype)
+        blocks.append(block)
+        w_slot, b_slot = _split(grads[index], shapes)
+
+        while True:
+
+            message = conn.recv()
+
+            if message[0] == "close":
+                break
+
+            elif message[0] == "data":
+
+                _, x_name, x_shape, t_name, t_shape = message
+
+                data = None
+                for block in blocks[2:]:
+                    block.close()
+                del blocks[2:]
+
+                block, x_buffer = _attach(x_name, x_shape, model.dtype)
+                blocks.append(block)
+                block, t_buffer = _attach(t_name, t_shape, model.dtype)
+                blocks.append(block)
+                data = (x_buffer, t_buffer)
+
+                conn.send(("ok",))
+
+            elif message[0] == "step":
+
+                _, start, stop = message
+
+                if start == stop:
+                    grads[index].fill(0)
+                    conn.send(("ok", 0.0, 0))
+                    continue
+
+                x = data[0][start:stop]
+                t = data[1][start:stop]
+
+                model.b_layers = list(b_view)
+
+                #the workspace writes the weight gradients straight into this worker's shared slot
+                workspace = model.get_workspace(x)
+                workspace.w_gradients = w_slot
+
+                out, error, batch_size = model.forward(x, t, workspace=workspace)
+                model.backward(out, t, batch_size, workspace=workspace)
+
+                b_slot[:] = model.b_gradients
+
+                conn.send(("ok", float(error), batch_size))
+
+    except Exception:
+        conn.send(("error", traceback.format_exc()))
+
+    finally:
+        #views must be released before the blocks are closed
+        model.w_layers, model.workspaces, model.fan_ins, model.fan_outs = [], {}, [], []
+        params = grads = w_slot = b_slot = b_view = data = x = t = workspace = None
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass
+
+    return
+
+
+class DataParallel():
+
+    def __init__(self, model, n_workers):
+
+        if n_workers < 2:
+            raise Exception("'n_workers' must be at least 2 for data-parallel training")
+
+        self.model = model
+        self.n_workers = n_workers
+        self.dtype = model.dtype
+        self.shapes = [w.shape for w in model.w_layers]
+        self.n_params = _parameter_count(self.shapes)
+
+        self.blocks = {}
+        self.x_buffer = None
+        self.t_buffer = None
+        self.capacity = 0
+
+        #weights move into shared memory, the model keeps training on views of it
+        self.blocks["params"], self.params = _create((self.n_params,), self.dtype)
+        self.w_views, self.b_view = _split(self.params, self.shapes)
+
+        for view, w in zip(self.w_views, model.w_layers):
+            view[:] = w
+        self.b_view[:] = model.b_layers
+
+        model.w_layers = self.w_views
+
+        self.blocks["grads"], self.grads = _create((n_workers, self.n_params), self.dtype)
+        self.reduced = np.empty(self.n_params, dtype=self.dtype)
+        self.w_gradients, self.b_gradients = _split(self.reduced, self.shapes)
+
+        #workers get a light copy of the model without weights, buffers or optimizer state
+        worker_model = copy.copy(model)
+        worker_model.w_layers, worker_model.w_gradients, worker_model.b_gradients = [], [], []
+        worker_model.fan_ins, worker_model.fan_outs, worker_model.error_log = [], [], []
+        worker_model.workspaces, worker_model.optimizer, worker_model.profiler, worker_model.masks = {}, None, None, None
+
+        self.connections = []
+        self.processes = []
+
+        for index in range(n_workers):
+
+            parent_conn, child_conn = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, args=(child_conn, worker_model, self.shapes, index, self.blocks["params"].name, self.blocks["grads"].name, n_workers), daemon=True)
+            process.start()
+
+            self.connections.append(parent_conn)
+            self.processes.append(process)
+
+        return
+
+    def receive(self, conn):
+
+        message = conn.recv()
+
+        if message[0] == "error":
+            raise Exception("data-parallel worker failed:\n" + message[1])
+
+        return message
+
+    def load(self, x, t):
+
+        #copies a batch into shared memory, growing the shared buffers when a larger batch arrives
+
+        rows = x.shape[0]
+
+        if rows > self.capacity or self.x_buffer.shape[1:] != x.shape[1:] or self.t_buffer.shape[1:] != t.shape[1:]:
+
+            self.x_buffer = self.t_buffer = None
+            for name in ("x", "t"):
+                if name in self.blocks:
+                    _release(self.blocks.pop(name))
+
+            capacity = max(rows, self.capacity)
+
+            self.blocks["x"], self.x_buffer = _create((capacity,) + x.shape[1:], self.dtype)
+            self.blocks["t"], self.t_buffer = _create((capacity,) + t.shape[1:], self.dtype)
+
+            self.capacity = capacity
+
+            for conn in self.connections:
+                conn.send(("data", self.blocks["x"].name, self.x_buffer.shape, self.blocks["t"].name, self.t_buffer.shape))
+            for conn in self.connections:
+                self.receive(conn)
+
+        self.x_buffer[:rows] = x
+        self.t_buffer[:rows] = t
+
+        return
+
+    def step(self, x, t):
+
+        #runs forward/backward over all workers, returns (error, batch_size) and leaves the summed gradients on the model
+
+        x = self.model.cast(x)
+        t = self.model.cast(t)
+
+        if type(x) is not np.ndarray:
+            raise Exception("data-parallel training takes dense inputs")
+
+        if x.ndim != 2:
+            raise Exception("data-parallel training takes 2-dimensional inputs")
+
+        if x.shape[0] % self.model.input_shape[0] != 0:
+            raise Exception("size of a mini-batch must be a multiple of specified input size of the model object")
+
+        self.load(x, t)
+
+        #shards are split on input boundaries, one input spans 'input_shape[0]' rows
+        group = self.model.input_shape[0]
+        n_inputs = x.shape[0] // group
+        bounds = [(k * n_inputs // self.n_workers) * group for k in range(self.n_workers + 1)]
+
+        for k, conn in enumerate(self.connections):
+            conn.send(("step", bounds[k], bounds[k+1]))
+
+        errors = []
+        for conn in self.connections:
+            _, error, batch_size = self.receive(conn)
+            errors.append((error, batch_size))
+
+        np.sum(self.grads, axis=0, out=self.reduced)
+
+        self.model.w_gradients = self.w_gradients
+        self.model.b_gradients = list(self.b_gradients)
+
+        #cross entropy is averaged over each shard, every other loss is a plain sum
+        if self.model.loss == "cross_entropy":
+            error = sum(error * batch_size for error, batch_size in errors) / n_inputs
+        else:
+            error = sum(error for error, _ in errors)
+
+        return error, n_inputs
+
+    def publish(self):
+
+        #biases are plain scalars on the model, so they are copied after every update
+        self.b_view[:] = self.model.b_layers
+        return
+
+    def close(self):
+
+        for conn in self.connections:
+            try:
+                conn.send(("close",))
+            except (OSError, BrokenPipeError):
+                pass
+
+        for process in self.processes:
+            process.join()
+
+        #hand private copies back to the model before shared memory goes away
+        self.model.w_layers = [np.array(view) for view in self.w_views]
+        self.model.w_gradients = [np.array(view) for view in self.w_gradients]
+
+        self.params = self.grads = self.reduced = self.x_buffer = self.t_buffer = None
+        self.w_views = self.b_view = self.w_gradients = self.b_gradients = None
+
+        for name in list(self.blocks):
+            _release(self.blocks.pop(name))
+
+        return
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+#'data_parallel' covers the workers' forward and backward passes, which run outside the profiled process
+PHASES = ["forward", "batch_norm", "activation", "loss", "backward", "data_parallel", "update"]
+
+
+class Profiler():
+
+    #records wall time, call counts and (optionally) bytes allocated per phase and layer
+    #
+    #    with model.profile() as profiler:
+    #        model.train(x, t, 0.01, iteration=100)
+    #    print(profiler.summary())
+    #    profiler.export_chrome_trace("trace.json")
+    #
+    #a profiler can also be hooked up by hand with 'model.profiler = Profiler()', then 'open'/'close' start and stop tracemalloc
+    #memory tracking goes through tracemalloc, which numpy reports its buffers to, and slows every call down noticeably
+
+    def __init__(self, track_memory=False, trace=True, max_events=1000000, model=None):
+
+        self.model = model
+        self.previous = None
+
+        self.track_memory = track_memory
+        self.trace = trace
+        self.max_events = max_events
+
+        #(phase, layer) -> [calls, seconds, bytes]
+        self.records = {}
+        self.events = []
+        self.dropped_events = 0
+
+        self.origin = time.perf_counter()
+        self.started_tracemalloc = False
+
+        return
+
+    def open(self):
+
+        if self.track_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+
+        return
+
+    def close(self):
+
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+        return
+
+    def __enter__(self):
+
+        self.open()
+
+        if self.model is not None:
+            self.previous = self.model.profiler
+            self.model.profiler = self
+
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+
+        if self.model is not None:
+            self.model.profiler = self.previous
+            self.previous = None
+
+        self.close()
+
+        return False
+
+    def start(self):
+
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            return time.perf_counter(), tracemalloc.get_traced_memory()[0]
+
+        return time.perf_counter(), 0
+
+    def stop(self, phase, layer, start):
+
+        end = time.perf_counter()
+        start_time, start_memory = start
+
+        #bytes allocated is the peak above the memory in use when the section started, temporaries included
+        if self.track_memory:
+            allocated = tracemalloc.get_traced_memory()[1] - start_memory
+        else:
+            allocated = 0
+
+        record = self.records.get((phase, layer))
+        if record is None:
+            record = self.records[(phase, layer)] = [0, 0.0, 0]
+
+        record[0] += 1
+        record[1] += end - start_time
+        record[2] += allocated
+
+        if self.trace:
+            if len(self.events) < self.max_events:
+                self.events.append((phase, layer, start_time, end - start_time, allocated))
+            else:
+                self.dropped_events += 1
+
+        return
+
+    def reset(self):
+
+        self.records = {}
+        self.events = []
+        self.dropped_events = 0
+        self.origin = time.perf_counter()
+
+        return
+
+    def table(self):
+
+        #list of dicts, one per (phase, layer), in phase then layer order
+
+        total = sum(record[1] for record in self.records.values())
+        rows = []
+
+        for (phase, layer), (calls, seconds, allocated) in sorted(self.records.items(), key=lambda item: (PHASES.index(item[0][0]) if item[0][0] in PHASES else len(PHASES), -1 if item[0][1] is None else item[0][1])):
+            rows.append({
+                "phase": phase,
+                "layer": layer,
+                "calls": calls,
+                "seconds": seconds,
+                "mean_us": seconds / calls * 1e6,
+                "percent": seconds / total * 100 if total > 0 else 0.0,
+                "bytes": allocated,
+            })
+
+        return rows
+
+    def summary(self):
+
+        lines = []
+        lines.append(f"{'phase':<14}{'layer':>6}{'calls':>10}{'total ms':>12}{'mean us':>12}{'%':>8}" + (f"{'MiB alloc':>12}" if self.track_memory else ""))
+
+        for row in self.table():
+            layer = "-" if row["layer"] is None else str(row["layer"]+1)
+            line = f"{row['phase']:<14}{layer:>6}{row['calls']:>10}{row['seconds']*1e3:>12.3f}{row['mean_us']:>12.1f}{row['percent']:>8.1f}"
+            if self.track_memory:
+                line += f"{row['bytes']/2**20:>12.3f}"
+            lines.append(line)
+
+        if self.dropped_events > 0:
+            lines.append(f"({self.dropped_events} trace events dropped, 'max_events' reached)")
+
+        return "\n".join(lines)
+
+    def export_chrome_trace(self, file):
+
+        #chrome trace event format, readable by chrome://tracing, perfetto and speedscope
+
+        pid = os.getpid()
+        tid = threading.get_ident()
+        events = []
+
+        for phase, layer, start, duration, allocated in self.events:
+            name = phase if layer is None else f"{phase} layer{layer+1}"
+            event = {"name": name, "cat": phase, "ph": "X", "ts": (start - self.origin) * 1e6, "dur": duration * 1e6, "pid": pid, "tid": tid}
+            if self.track_memory:
+                event["args"] = {"bytes": allocated}
+            events.append(event)
+
+        with open(file, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+        return
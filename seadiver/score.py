@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import argparse
+import itertools
+import queue
+import sys
+import threading
+import time
+
+from seadiver import model as sd
+
+
+#streaming batch scoring
+#
+#the input is read in chunks of 'chunk_size' inputs by a reader thread, scored by a compiled InferencePlan and written by a
+#writer thread, so reading, computing and writing overlap; at most 'queue_size' chunks wait between two stages, which bounds
+#memory by the chunk size whatever the size of the input
+#
+#.npy inputs are memory-mapped, anything else is read as delimited text (CSV)
+#.npy outputs are written into a memory-mapped file of the final size, anything else is written as delimited text
+#
+#    seadiver.score.score("model.sdv", "input.npy", "scores.npy", chunk_size=8192)
+#    python -m seadiver.score model.sdv input.csv scores.csv --chunk-size 8192
+#
+#not imported by 'import seadiver', so that running it with -m does not import it twice
+
+
+def is_npy(path):
+    return isinstance(path, str) and path.lower().endswith(".npy")
+
+def count_text_rows(path, skip_header=0):
+
+    #number of non-empty lines after the header, needed to size a .npy output for a text input
+    rows = 0
+
+    with open(path, "rb") as f:
+        for line in itertools.islice(f, skip_header, None):
+            if line.strip():
+                rows += 1
+
+    return rows
+
+def read_chunks(source, chunk_rows, dtype, delimiter=",", skip_header=0):
+
+    #yields 2-dimensional arrays of at most 'chunk_rows' rows, 'source' is a path or an array (e.g. a memmap)
+
+    if is_npy(source):
+        source = np.load(source, mmap_mode="r")
+
+    if not isinstance(source, str):
+
+        if source.ndim != 2:
+            raise Exception("the input must be a 2-dimensional array")
+
+        #the copy reads the chunk's pages here, in the reader thread
+        for start in range(0, source.shape[0], chunk_rows):
+            yield np.array(source[start:start+chunk_rows], dtype=dtype)
+
+        return
+
+    with open(source, "r") as f:
+
+        lines = (line for line in itertools.islice(f, skip_header, None) if line.strip())
+
+        while True:
+            chunk = list(itertools.islice(lines, chunk_rows))
+            if len(chunk) == 0:
+                return
+            yield np.loadtxt(chunk, dtype=dtype, delimiter=delimiter, ndmin=2)
+
+def put(q, item, stop):
+
+    #blocks until there is room in 'q', unless the pipeline is stopping
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+
+    return False
+
+def get(q, stop):
+
+    #the next item of 'q', None once the pipeline is stopping and 'q' is drained
+    while True:
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return None
+
+def read_loop(chunks, q, stop):
+
+    try:
+        for chunk in chunks:
+            if not put(q, chunk, stop):
+                return
+        put(q, None, stop)
+
+    except Exception as e:
+        put(q, e, stop)
+
+    return
+
+def write_loop(output, q, stop, delimiter, fmt, errors):
+
+    try:
+        with open(output, "w") as f:
+            while True:
+                item = get(q, stop)
+                if item is None:
+                    return
+                np.savetxt(f, item, fmt=fmt, delimiter=delimiter)
+
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+
+    return
+
+
+def score(model, source, output, chunk_size=8192, queue_size=2, delimiter=",", skip_header=0, fmt="%.17g", display=True):
+
+    #scores every input of 'source' (a path or an array) with 'model' (an ANN or a path read by 'make') and writes the outputs to 'output'
+    #returns {"rows", "seconds", "rows_per_sec"}
+
+    if chunk_size < 1:
+        raise Exception("'chunk_size' must be a positive integer")
+    if queue_size < 1:
+        raise Exception("'queue_size' must be a positive integer")
+
+    if isinstance(model, str):
+        model = sd.make(model)
+
+    group = model.input_shape[0]
+    chunk_rows = chunk_size * group
+    features = model.w_layers[-1].shape[1]
+
+    plan = model.compile_inference(chunk_size)
+
+    #a .npy output is created at its final size, so its rows are counted before scoring starts
+    out = None
+    if is_npy(output):
+        if is_npy(source):
+            rows = np.load(source, mmap_mode="r").shape[0]
+        elif isinstance(source, str):
+            rows = count_text_rows(source, skip_header)
+        else:
+            rows = source.shape[0]
+        out = np.lib.format.open_memmap(output, mode="w+", dtype=plan.dtype, shape=(rows, features))
+
+    stop = threading.Event()
+    errors = []
+
+    read_queue = queue.Queue(queue_size)
+    reader = threading.Thread(target=read_loop, args=(read_chunks(source, chunk_rows, plan.dtype, delimiter, skip_header), read_queue, stop), daemon=True)
+
+    if out is None:
+        write_queue = queue.Queue(queue_size)
+        writer = threading.Thread(target=write_loop, args=(output, write_queue, stop, delimiter, fmt, errors), daemon=True)
+        writer.start()
+    else:
+        writer = None
+
+    reader.start()
+
+    start_time = time.perf_counter()
+    last_display = start_time
+    row = 0
+
+    try:
+        while True:
+
+            chunk = get(read_queue, stop)
+
+            if chunk is None:
+                break
+            if isinstance(chunk, Exception):
+                raise Exception("input could not be read: " + str(chunk))
+
+            if out is not None:
+                if row + chunk.shape[0] > out.shape[0]:
+                    raise Exception("the input has more rows than were counted for the output")
+                plan.predict(chunk, out[row:row+chunk.shape[0]])
+            else:
+                #each chunk gets its own output array, the writer may still be formatting the previous one
+                if not put(write_queue, plan.predict(chunk), stop):
+                    break
+
+            row += chunk.shape[0]
+
+            if display and time.perf_counter() - last_display >= 1:
+                last_display = time.perf_counter()
+                print(f"scored {str(row)} rows, {str(int(row / (last_display - start_time)))} rows/sec", end="\r", flush=True)
+
+        if writer is not None:
+            put(write_queue, None, stop)
+            writer.join()
+
+        if errors:
+            raise Exception("output could not be written: " + str(errors[0]))
+
+        if out is not None:
+            if row != out.shape[0]:
+                raise Exception("the input has fewer rows than were counted for the output")
+            out.flush()
+
+    finally:
+        stop.set()
+        reader.join()
+        if writer is not None:
+            writer.join()
+        out = None
+
+    seconds = time.perf_counter() - start_time
+    stats = {"rows": row, "seconds": seconds, "rows_per_sec": row / seconds if seconds > 0 else 0.0}
+
+    if display:
+        print(f"scored {str(row)} rows in {seconds:.2f} sec, {str(int(stats['rows_per_sec']))} rows/sec          ")
+
+    return stats
+
+
+def main():
+
+    parser = argparse.ArgumentParser(description="score a file with a seadiver model, streaming it in chunks")
+    parser.add_argument("model", help="model file written by 'export' or 'export_binary'")
+    parser.add_argument("input", help=".npy file or delimited text (CSV) file")
+    parser.add_argument("output", help=".npy file or delimited text (CSV) file")
+    parser.add_argument("--chunk-size", type=int, default=8192, help="inputs scored at a time")
+    parser.add_argument("--queue-size", type=int, default=2, help="chunks waiting between reading, scoring and writing")
+    parser.add_argument("--delimiter", default=",", help="delimiter of text files")
+    parser.add_argument("--skip-header", type=int, default=0, help="lines to skip at the top of a text input")
+    parser.add_argument("--fmt", default="%.17g", help="number format of a text output")
+    parser.add_argument("--quiet", action="store_true", help="do not report progress")
+    args = parser.parse_args()
+
+    score(args.model, args.input, args.output, args.chunk_size, args.queue_size, args.delimiter, args.skip_header, args.fmt, not args.quiet)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import asyncio
+
+
+class BatchingPredictor():
+
+    #collects concurrent predict requests into one batch and scatters the rows back to the callers
+    #
+    #a batch is flushed once it holds 'max_batch_size' inputs or 'max_wait_us' microseconds after its first request arrived,
+    #a batch never holds more than 'max_batch_size' inputs, larger requests are split
+    #'predictor' is an ANN, an InferencePlan or any callable mapping an input array to an output array
+    #
+    #    async with BatchingPredictor(model.compile_inference(64), max_batch_size=64) as server:
+    #        y = await server.predict(x)
+
+    def __init__(self, predictor, max_batch_size=64, max_wait_us=500, executor=None):
+
+        if max_batch_size < 1:
+            raise Exception("'max_batch_size' must be a positive integer")
+        if max_wait_us < 0:
+            raise Exception("'max_wait_us' must not be negative")
+
+        if hasattr(predictor, "predict"):
+            self.predict_function = predictor.predict
+        elif callable(predictor):
+            self.predict_function = predictor
+        else:
+            raise Exception("'predictor' must be a model, an InferencePlan or a callable")
+
+        #rows per model input, requests are counted and checked in whole inputs
+        #the width of a row is checked when the predictor has an input shape, a callable's inputs are not checked
+        if hasattr(predictor, "input_shape"):
+            self.group = predictor.input_shape[0]
+            self.features = predictor.input_shape[1]
+        else:
+            self.group = 1
+            self.features = None
+
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_us / 1e6
+        self.executor = executor
+
+        self.queue = None
+        self.task = None
+        self.stopping = False
+
+        self.reset_stats()
+
+        return
+
+    def reset_stats(self):
+
+        self.requests = 0
+        self.batches = 0
+        self.inputs = 0
+        self.largest_batch = 0
+        self.deepest_queue = 0
+
+        return
+
+    def stats(self):
+
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "inputs": self.inputs,
+            "mean_batch_size": self.inputs / self.batches if self.batches > 0 else 0.0,
+            "largest_batch": self.largest_batch,
+            "queue_depth": self.queue.qsize() if self.queue is not None else 0,
+            "deepest_queue": self.deepest_queue,
+        }
+
+    async def start(self):
+
+        if self.task is not None:
+            raise Exception("the predictor is already running")
+
+        self.queue = asyncio.Queue()
+        self.stopping = False
+        self.task = asyncio.get_running_loop().create_task(self.serve())
+
+        return self
+
+    async def stop(self):
+
+        #requests queued before 'stop' are still answered, requests made once it is called are rejected
+
+        if self.task is None:
+            return
+
+        if not self.stopping:
+            self.stopping = True
+            await self.queue.put(None)
+
+        await self.task
+
+        self.task = None
+        self.stopping = False
+
+        return
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.stop()
+
+    async def predict(self, x):
+
+        if self.task is None:
+            raise Exception("the predictor is not running, call 'start' first")
+        if self.stopping:
+            raise Exception("the predictor is stopping")
+
+        x = np.asarray(x)
+        if x.ndim == 1:
+            x = x.reshape(1, -1)
+
+        if x.ndim != 2:
+            raise Exception("an input must be a 1 or 2-dimensional array")
+        if self.features is not None and x.shape[1] != self.features:
+            raise Exception(f"an input must have {str(self.features)} features, got {str(x.shape[1])}")
+        if x.shape[0] % self.group != 0:
+            raise Exception("size of an input must be a multiple of specified input size of the model object")
+
+        #a request larger than a batch is queued in parts of at most 'max_batch_size' inputs
+        loop = asyncio.get_running_loop()
+        part_rows = self.max_batch_size * self.group
+        futures = []
+
+        for start in range(0, max(x.shape[0], 1), part_rows):
+            future = loop.create_future()
+            await self.queue.put((x[start:start+part_rows], future))
+            futures.append(future)
+
+        self.requests += 1
+        self.deepest_queue = max(self.deepest_queue, self.queue.qsize())
+
+        if len(futures) == 1:
+            return await futures[0]
+
+        return np.concatenate(await asyncio.gather(*futures))
+
+    async def serve(self):
+
+        loop = asyncio.get_running_loop()
+        stopping = False
+        pending = None
+
+        while not stopping:
+
+            #a request that did not fit in the last batch starts the next one
+            if pending is not None:
+                item, pending = pending, None
+            else:
+                item = await self.queue.get()
+                if item is None:
+                    break
+
+            batch = [item]
+            size = item[0].shape[0] // self.group
+            deadline = loop.time() + self.max_wait
+
+            while size < self.max_batch_size:
+
+                #take whatever is already queued before waiting for more
+                if not self.queue.empty():
+                    item = self.queue.get_nowait()
+                else:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        break
+
+                if item is None:
+                    stopping = True
+                    break
+
+                if size + item[0].shape[0] // self.group > self.max_batch_size:
+                    pending = item
+                    break
+
+                batch.append(item)
+                size += item[0].shape[0] // self.group
+
+            await self.run_batch(batch, size)
+
+        #nothing is queued behind the sentinel once 'stop' is called, but no request may be left waiting forever
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not None and not item[1].done():
+                item[1].set_exception(Exception("the predictor was stopped"))
+
+        return
+
+    async def run_batch(self, batch, size):
+
+        try:
+            if len(batch) == 1:
+                x = batch[0][0]
+            else:
+                x = np.concatenate([x for x, _ in batch])
+
+            if self.executor is None:
+                out = self.predict_function(x)
+            else:
+                out = await asyncio.get_running_loop().run_in_executor(self.executor, self.predict_function, x)
+
+            #predictors may return a reused buffer, so the results are copied out once before they are scattered
+            out = np.array(out)
+
+        except Exception as e:
+
+            #one bad request must not fail the others, so a failed batch is retried request by request
+            if len(batch) > 1:
+                for item in batch:
+                    await self.run_batch([item], item[0].shape[0] // self.group)
+                return
+
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        row = 0
+        for x, future in batch:
+            if not future.done():
+                future.set_result(out[row:row+x.shape[0]])
+            row += x.shape[0]
+
+        self.batches += 1
+        self.inputs += size
+        self.largest_batch = max(self.largest_batch, size)
+
+        return
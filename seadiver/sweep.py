@@ -0,0 +1,369 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import concurrent.futures
+import contextlib
+import inspect
+import itertools
+import math
+import os
+import time
+import traceback
+
+from seadiver import model as sd
+from seadiver import parallel
+from seadiver.dataset import Dataset, is_sparse
+
+
+#hyperparameter sweeps
+#
+#the training (and validation) arrays are copied into shared memory once, every worker process of the pool maps them
+#read-only, so a sweep holds one copy of the data however many trials run at once
+#a trial is one set of 'ANN' and 'train' arguments; trials are trained rung by rung under successive halving:
+#after every rung only the best 1/eta of the trials (by validation error) go on to train for eta times as long
+#
+#    with Sweep(x, t, validation=(x_val, t_val), n_workers=4) as sweep:
+#        sweep.run({"structure": [(64, 10), (256, 10)], "activation": ["sigmoid", "relu"], "learning_rate": [0.1, 0.01]},
+#                  fixed={"output": "softmax", "batch_size": 32}, max_iterations=2000)
+#        sweep.export_best("models")
+#
+#for best throughput, limit BLAS to one thread per worker (e.g. OMP_NUM_THREADS=1)
+
+
+#'train' arguments a sweep sets itself
+RESERVED = ["x", "t", "iteration", "epochs", "display", "save_log", "flush_log", "validation", "checkpoint", "n_workers"]
+
+#steps trained between two looks at the clock when a trial has a time budget
+TIME_CHECK_STEPS = 20
+
+
+def grid(space):
+
+    #every combination of the listed values, in order
+    names = list(space)
+
+    return [dict(zip(names, values)) for values in itertools.product(*[space[name] for name in names])]
+
+def random_search(space, n_trials, seed=None):
+
+    #'n_trials' samples, a list is sampled uniformly and a callable is called with a numpy RandomState (see 'uniform', 'log_uniform')
+    random = np.random.RandomState(seed)
+    trials = []
+
+    for _ in range(n_trials):
+        trial = {}
+        for name, values in space.items():
+            if callable(values):
+                trial[name] = values(random)
+            else:
+                trial[name] = values[random.randint(len(values))]
+        trials.append(trial)
+
+    return trials
+
+def uniform(low, high):
+    return lambda random: float(random.uniform(low, high))
+
+def log_uniform(low, high):
+    return lambda random: float(np.exp(random.uniform(np.log(low), np.log(high))))
+
+def split_arguments(arguments):
+
+    #('ANN' arguments, 'train' arguments) of a trial
+
+    model_names = set(inspect.signature(sd.ANN.__init__).parameters) - {"self"}
+    train_names = set(inspect.signature(sd.ANN.train).parameters) - {"self"} - set(RESERVED)
+
+    model_arguments = {}
+    train_arguments = {}
+
+    for name, value in arguments.items():
+        if name in model_names:
+            model_arguments[name] = value
+        elif name in train_names:
+            train_arguments[name] = value
+        elif name in RESERVED:
+            raise Exception(f"'{name}' is set by the sweep and cannot be searched")
+        else:
+            raise Exception(f"'{name}' is neither an 'ANN' nor a 'train' argument")
+
+    if "learning_rate" not in train_arguments:
+        raise Exception("'learning_rate' must be given in the search space or in 'fixed'")
+    if "structure" not in model_arguments or "output" not in model_arguments:
+        raise Exception("'structure' and 'output' must be given in the search space or in 'fixed'")
+
+    return model_arguments, train_arguments
+
+
+#worker side: the shared arrays are attached once per process by the pool's initializer
+
+_blocks = []
+_arrays = None
+
+def _attach_dataset(descriptors):
+
+    global _arrays
+
+    arrays = []
+    for name, shape, dtype in descriptors:
+        block, array = parallel._attach(name, shape, dtype)
+        array.flags.writeable = False
+        _blocks.append(block)
+        arrays.append(array)
+
+    _arrays = arrays
+
+    return
+
+def _run_trial(model, model_arguments, train_arguments, target_steps, target_seconds, seconds):
+
+    #trains a trial (a new one when 'model' is None) until it has 'target_steps' steps or 'target_seconds' seconds in total, whichever comes first
+    #returns (model, score, steps, seconds, status, message)
+
+    x, t = _arrays[0], _arrays[1]
+    validation = (_arrays[2], _arrays[3]) if len(_arrays) == 4 else None
+
+    steps = 0
+    status = "running"
+
+    try:
+        #termination notices are reflected in the status, the pool's output stays readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+
+            if model is None:
+                model = sd.ANN(**model_arguments)
+                optimizer = train_arguments.get("optimizer")
+            else:
+                optimizer = None
+
+            arguments = {name: value for name, value in train_arguments.items() if name not in ("learning_rate", "optimizer")}
+            start_time = time.perf_counter()
+
+            while True:
+
+                done = model.optimizer.step_count if model.optimizer is not None else 0
+
+                if target_steps is not None and done >= target_steps:
+                    break
+                if target_seconds is not None and seconds + time.perf_counter() - start_time >= target_seconds:
+                    break
+
+                #mini-batches when 'batch_size' is given, otherwise full-batch steps
+                iteration = target_steps - done if target_steps is not None else TIME_CHECK_STEPS
+                if target_seconds is not None:
+                    iteration = min(iteration, TIME_CHECK_STEPS)
+
+                model.train(x, t, train_arguments["learning_rate"], iteration=iteration, optimizer=optimizer, display=False, **arguments)
+                optimizer = None
+
+                #'train' returns early when learning stalls
+                if model.optimizer.step_count - done < iteration:
+                    status = "stalled"
+                    break
+
+            seconds += time.perf_counter() - start_time
+            steps = model.optimizer.step_count
+
+            if validation is not None:
+                score = float(model.evaluate(validation[0], validation[1]))
+            else:
+                score = float(model.evaluate(x, t))
+
+        if not np.isfinite(score):
+            score = math.inf
+
+        #training buffers are rebuilt by the next rung, so they are not sent back
+        model.workspaces, model.fan_ins, model.fan_outs = {}, [], []
+        model.w_gradients, model.b_gradients, model.error_log = [], [], []
+        model.bn_caches, model.folded = [None]*len(model.w_layers), None
+
+        return model, score, steps, seconds, status, None
+
+    except Exception:
+        return None, math.inf, steps, seconds, "failed", traceback.format_exc()
+
+
+class Sweep():
+
+    def __init__(self, x, t, validation=None, n_workers=None):
+
+        if isinstance(x, Dataset):
+            x, t = x.x, x.t
+        if isinstance(validation, Dataset):
+            validation = (validation.x, validation.t)
+
+        if t is None:
+            raise Exception("a sweep needs answers ('t') to train on")
+        if is_sparse(x) or (validation is not None and is_sparse(validation[0])):
+            raise Exception("sweeps take dense inputs")
+
+        self.n_workers = n_workers if n_workers is not None else os.cpu_count()
+
+        if self.n_workers < 1:
+            raise Exception("'n_workers' must be a positive integer")
+
+        arrays = [x, t] if validation is None else [x, t, validation[0], validation[1]]
+
+        #the data is copied into shared memory once, trials only ever see read-only views of it
+        self.blocks = []
+        self.descriptors = []
+
+        for array in arrays:
+            array = np.asarray(array)
+            block, shared = parallel._create(array.shape, array.dtype)
+            shared[...] = array
+            self.blocks.append(block)
+            self.descriptors.append((block.name, array.shape, array.dtype))
+
+        self.input_shape = (1, np.shape(x)[1])
+        self.executor = None
+
+        self.results = []
+        self.best = None
+        self.best_model = None
+
+        return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def run(self, space, search="grid", n_trials=None, seed=None, fixed=None, max_iterations=None, max_seconds=None, eta=3, n_rungs=None, export=None):
+
+        #trains every trial of 'space' and returns the results, best first
+        #'max_iterations' and 'max_seconds' budget each trial, successive halving splits that budget into 'n_rungs' rungs growing by 'eta'
+        #(by default enough rungs for one trial to reach the last one), eta=None trains every trial to the full budget
+        #'export' is a directory the best model is written to, in the binary format
+
+        if max_iterations is None and max_seconds is None:
+            raise Exception("either 'max_iterations' or 'max_seconds' must be specified")
+        if eta is not None and eta < 2:
+            raise Exception("'eta' must be at least 2")
+
+        if search == "grid":
+            if n_trials is not None:
+                raise Exception("'n_trials' is only used by random search")
+            trials = grid(space)
+        elif search == "random":
+            if n_trials is None:
+                raise Exception("'n_trials' must be specified for random search")
+            trials = random_search(space, n_trials, seed)
+        else:
+            raise Exception("'search' must be 'grid' or 'random'")
+
+        if len(trials) == 0:
+            raise Exception("the search space has no trials")
+
+        if fixed is None:
+            fixed = {}
+
+        arguments = []
+        for trial in trials:
+            model_arguments, train_arguments = split_arguments({**fixed, **trial})
+            model_arguments.setdefault("input_shape", self.input_shape)
+            arguments.append((model_arguments, train_arguments))
+
+        if eta is None:
+            n_rungs = 1
+        elif n_rungs is None:
+            n_rungs = int(math.log(len(trials), eta) + 1e-9) + 1
+
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(self.n_workers, initializer=_attach_dataset, initargs=(self.descriptors,))
+
+        results = [{"trial": i, "params": trial, "score": math.inf, "steps": 0, "seconds": 0.0, "rung": -1, "status": "pending", "message": None} for i, trial in enumerate(trials)]
+        models = [None]*len(trials)
+        active = list(range(len(trials)))
+
+        for rung in range(n_rungs):
+
+            #rung budgets grow by 'eta' up to the full budget of the last rung
+            fraction = 1.0 if eta is None else float(eta) ** (rung - n_rungs + 1)
+            target_steps = max(1, int(round(max_iterations * fraction))) if max_iterations is not None else None
+            target_seconds = max_seconds * fraction if max_seconds is not None else None
+
+            futures = {}
+            for i in active:
+                model_arguments, train_arguments = arguments[i]
+                futures[self.executor.submit(_run_trial, models[i], model_arguments, train_arguments, target_steps, target_seconds, results[i]["seconds"])] = i
+
+            for future in concurrent.futures.as_completed(futures):
+                i = futures[future]
+                model, score, steps, seconds, status, message = future.result()
+                models[i] = model
+                results[i].update({"score": score, "steps": steps, "seconds": seconds, "rung": rung, "status": status, "message": message})
+
+            #stalled and failed trials cannot use a larger budget
+            survivors = sorted((i for i in active if results[i]["status"] == "running"), key=lambda i: results[i]["score"])
+
+            if rung == n_rungs - 1:
+                break
+
+            keep = max(1, len(active) // eta)
+
+            for i in survivors[keep:]:
+                results[i]["status"] = "pruned"
+                models[i] = None
+            for i in active:
+                if results[i]["status"] != "running":
+                    models[i] = None
+
+            active = survivors[:keep]
+
+            if len(active) == 0:
+                break
+
+        for i in active:
+            if results[i]["status"] == "running":
+                results[i]["status"] = "completed"
+
+        #trials that got further are ranked first, scores of different budgets are not comparable
+        self.results = sorted(results, key=lambda result: (-result["rung"], result["score"]))
+        self.best = self.results[0]
+        self.best_model = models[self.best["trial"]]
+
+        if self.best_model is None:
+            raise Exception("every trial failed, the first error was:\n" + next(result["message"] for result in self.results if result["message"] is not None))
+
+        if export is not None:
+            self.export_best(export)
+
+        return self.results
+
+    def export_best(self, directory=".", file_name=None, include="essential"):
+
+        if self.best_model is None:
+            raise Exception("no sweep has been run yet")
+
+        if file_name is None:
+            file_name = f"sweep-best-trial{self.best['trial']}.sdv"
+
+        self.best_model.export_binary(directory, file_name, include)
+
+        return os.path.join(directory, file_name)
+
+    def summary(self):
+
+        lines = [f"{'trial':>6}{'rung':>6}{'steps':>9}{'seconds':>10}{'score':>14}  {'status':<10}params"]
+
+        for result in self.results:
+            lines.append(f"{result['trial']:>6}{result['rung']+1:>6}{result['steps']:>9}{result['seconds']:>10.2f}{result['score']:>14.6g}  {result['status']:<10}{result['params']}")
+
+        return "\n".join(lines)
+
+    def close(self):
+
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+        for block in self.blocks:
+            parallel._release(block)
+        self.blocks = []
+
+        return
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+#plotting utilities, kept apart from seadiver.model so that matplotlib stays an optional dependency
+
+try:
+    import matplotlib as mpl
+    import matplotlib.pyplot as plt
+except ImportError:
+    raise ImportError("seadiver visualization requires matplotlib: pip install matplotlib")
+
+
+def visualize_error_log(error_log):
+
+    mpl.rc('xtick', color = '#4A4A4A', labelsize = 12)
+    mpl.rc('ytick', color = '#4A4A4A', labelsize = 12)
+    mpl.rc('lines', linewidth = 1.5, markeredgewidth = 0)
+    mpl.rc('axes', labelsize= 18, titlesize = 30, titlepad=40, labelpad = 17)
+    mpl.rc('axes.spines', left=False, right=False, top=False, bottom = False)
+
+    fig = plt.figure(figsize = (20, 10))
+    plt.plot(error_log, color="#00ACCD")
+    plt.xlabel('Step')
+    plt.ylabel('Error')
+    plt.grid(True, color='#00ACCD', alpha=0.2, linestyle='--')
+
+    plt.show()
+
+    return
+  
+def visualize_fanio_dist(fan_ins, fan_outs):
+
+    mpl.rc('xtick', color = '#4A4A4A', labelsize = 12)
+    mpl.rc('ytick', color = '#4A4A4A', labelsize = 12)
+    mpl.rc('lines', linewidth = 1.5, markeredgewidth = 0)
+    mpl.rc('axes', labelsize= 14, titlesize = 30, titlepad=40, labelpad = 17)
+    mpl.rc('axes.spines', left=False, right=False, top=False, bottom = False)
+    mpl.rc('figure', titlesize = 20, figsize = (20, 7))
+
+    fig1, fi_axes = plt.subplots(1, len(fan_ins)-1)
+    fig2, fo_axes = plt.subplots(1, len(fan_outs))
+
+    fig1.suptitle("Actiavation Distributions")
+    fig2.suptitle("Fan Out Distributions")
+
+    for i in range(len(fan_outs)):
+
+        fi_axes[i].hist(fan_ins[i+1].reshape(1, -1)[0], bins=20, color="#00ACCD")
+        fi_axes[i].set_xlabel('Layer' + str(i+1))
+        fi_axes[i].grid(True, color='#00ACCD', alpha=0.2, linestyle='--')
+
+        fo_axes[i].hist(fan_outs[i].reshape(1, -1)[0], bins=20, color="#00ACCD")
+        fo_axes[i].set_xlabel('Layer' + str(i+1))
+        fo_axes[i].grid(True, color='#00ACCD', alpha=0.2, linestyle='--')
+    
+    plt.show()
+
+    return
@@ -30,6 +30,7 @@ setup(
     classifiers = classifiers,
     packages = ["seadiver"],
     include_package_data = True,
-    install_requires = ['numpy', 'matplotlib']
+    install_requires = ['numpy'],
+    extras_require = {'visualize': ['matplotlib']}
 )
 
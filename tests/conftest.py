@@ -0,0 +1,17 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import pytest
+
+
+@pytest.fixture
+def data():
+
+    #64 inputs of 8 features and one-hot answers over 3 classes
+    random = np.random.RandomState(0)
+    x = random.randn(64, 8)
+    t = np.eye(3)[random.randint(0, 3, 64)]
+
+    return x, t
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+from seadiver import model as sd
+
+
+def make_model(structure, seed=0):
+    np.random.seed(seed)
+    return sd.ANN((1, 8), structure, "softmax", activation="sigmoid", batch_norm=True)
+
+
+def test_gradients(data):
+
+    x, t = data
+    model = make_model((5, 4, 3))
+
+    out, error, rows = model.forward(x, t)
+    model.backward(out, t, rows)
+
+    def numerical(array, index, eps=1e-6):
+        array[index] += eps
+        plus = model.forward(x, t)[1]
+        array[index] -= 2*eps
+        minus = model.forward(x, t)[1]
+        array[index] += eps
+        return (plus - minus) / (2*eps)
+
+    analytic = [model.gamma_gradients[0][2], model.beta_gradients[1][1], model.w_gradients[0][3, 1]]
+    numeric = [numerical(model.gammas[0], 2), numerical(model.betas[1], 1), numerical(model.w_layers[0], (3, 1))]
+
+    #gradients are summed over the rows of the batch, the error is their mean
+    np.testing.assert_allclose(np.array(analytic) / rows, numeric, rtol=1e-4, atol=1e-9)
+
+def test_buffer_modes_match(data):
+
+    x, t = data
+    weights = []
+
+    for options in [dict(workspace=True), dict(workspace=False), dict(workspace=False, recompute=1)]:
+        model = make_model((8, 8, 8, 3))
+        np.random.seed(1)
+        model.train(x, t, 0.05, batch_size=16, epochs=3, display=False, **options)
+        weights.append(model.w_layers + model.gammas + model.running_vars)
+
+    for other in weights[1:]:
+        for w, w_other in zip(weights[0], other):
+            np.testing.assert_array_equal(w, w_other)
+
+def test_folding(data):
+
+    #inference folds the running statistics into the weights
+    x, t = data
+    model = make_model((8, 3))
+    model.train(x, t, 0.05, batch_size=16, epochs=5, display=False)
+
+    z = x @ model.w_layers[0] + model.b_layers[0]
+    z = (z - model.running_means[0]) / np.sqrt(model.running_vars[0] + model.bn_epsilon) * model.gammas[0] + model.betas[0]
+    z = 1 / (1 + np.exp(-z)) @ model.w_layers[1] + model.b_layers[1]
+    if model.batch_norm[1]:
+        z = (z - model.running_means[1]) / np.sqrt(model.running_vars[1] + model.bn_epsilon) * model.gammas[1] + model.betas[1]
+    expected = np.exp(z - z.max(axis=1, keepdims=True))
+    expected /= expected.sum(axis=1, keepdims=True)
+
+    np.testing.assert_allclose(model.predict(x), expected, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(model.compile_inference(64).predict(x), expected, rtol=1e-10, atol=1e-12)
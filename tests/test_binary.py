@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import os
+
+import pytest
+
+from seadiver import binary
+from seadiver import model as sd
+
+
+def trained_model(data, structure=(16, 16, 3), **kwargs):
+    x, t = data
+    np.random.seed(0)
+    model = sd.ANN((1, 8), structure, "softmax", activation="sigmoid")
+    model.train(x, t, 0.1, batch_size=16, epochs=2, optimizer="adam", display=False, **kwargs)
+    return model, x
+
+
+def test_binary_round_trip(tmp_path, data):
+
+    model, x = trained_model(data)
+    model.export_binary(str(tmp_path), "model.sdv", include="all")
+
+    for mmap in (True, False):
+        loaded = sd.make(str(tmp_path / "model.sdv"), mmap=mmap)
+        for w, w_loaded in zip(model.w_layers, loaded.w_layers):
+            np.testing.assert_array_equal(w, w_loaded)
+        np.testing.assert_array_equal(model.predict(x), loaded.predict(x))
+        assert loaded.optimizer.step_count == model.optimizer.step_count
+
+def test_json_round_trip(tmp_path, data):
+
+    model, x = trained_model(data)
+    model.export(str(tmp_path), "model.json", include="all")
+
+    #'export' joins with a backslash
+    loaded = sd.make(str(tmp_path) + "\\" + "model.json")
+
+    np.testing.assert_allclose(model.predict(x), loaded.predict(x))
+
+def test_recomputed_session_exports_all(tmp_path, data):
+
+    #the fan-ins and fan-outs released by recomputation are left out of the file
+    model, x = trained_model(data, structure=(16, 16, 16, 3), workspace=False, recompute=2)
+    assert any(fan_io is None for fan_io in model.fan_ins + model.fan_outs)
+
+    model.export_binary(str(tmp_path), "model.sdv", include="all")
+    loaded = sd.make(str(tmp_path / "model.sdv"))
+
+    np.testing.assert_array_equal(model.predict(x), loaded.predict(x))
+
+def test_write_rejects_object_arrays(tmp_path):
+
+    with pytest.raises(Exception):
+        binary.write(str(tmp_path / "model.sdv"), {}, {"fan_ins": [np.asarray([None, None])]})
+
+    assert not os.path.exists(tmp_path / "model.sdv")
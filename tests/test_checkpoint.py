@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import copy
+import os
+
+from seadiver import binary
+from seadiver import checkpoint as ck
+from seadiver import model as sd
+
+
+def make_model():
+    np.random.seed(0)
+    return sd.ANN((1, 8), (16, 3), "softmax", activation="sigmoid")
+
+
+def test_resume_continues_training(tmp_path, data):
+
+    #a resumed model trains on exactly as the original does, optimizer state included
+    x, t = data
+    model = make_model()
+
+    with ck.Checkpointer(str(tmp_path), every=8) as checkpointer:
+        model.train(x, t, 0.01, batch_size=8, epochs=2, optimizer="adam", display=False, checkpoint=checkpointer)
+
+    resumed = ck.resume(str(tmp_path))
+    assert resumed.optimizer.step_count == model.optimizer.step_count
+
+    original = copy.deepcopy(model)
+    for trained in (original, resumed):
+        np.random.seed(1)
+        trained.train(x, t, 0.01, batch_size=8, epochs=2, display=False)
+
+    for w, w_resumed in zip(original.w_layers, resumed.w_layers):
+        np.testing.assert_array_equal(w, w_resumed)
+
+def test_resume_with_a_new_optimizer(tmp_path, data):
+
+    #a new optimizer counts steps from zero, the checkpoints of the second session must still be the newest
+    x, t = data
+    model = make_model()
+
+    with ck.Checkpointer(str(tmp_path), every=4, keep=2) as checkpointer:
+        model.train(x, t, 0.01, batch_size=8, epochs=2, optimizer="adam", display=False, checkpoint=checkpointer)
+
+    resumed = ck.resume(str(tmp_path))
+
+    with ck.Checkpointer(str(tmp_path), every=4, keep=2) as checkpointer:
+        resumed.train(x, t, 0.01, batch_size=8, epochs=1, optimizer="adam", display=False, checkpoint=checkpointer)
+
+    assert [os.path.basename(path) for path in ck.list_checkpoints(str(tmp_path))] == ["checkpoint-000000005.sdv", "checkpoint-000000006.sdv"]
+
+    fields, _ = binary.read(ck.latest(str(tmp_path)))
+    assert fields["checkpoint_step"] == 8
+
+    for w, w_resumed in zip(resumed.w_layers, ck.resume(str(tmp_path)).w_layers):
+        np.testing.assert_array_equal(w, w_resumed)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+from seadiver import ensemble as en
+from seadiver import model as sd
+
+
+def make_models(input_shape, n=3):
+    models = []
+    for seed in range(n):
+        np.random.seed(seed)
+        models.append(sd.ANN(input_shape, (8, 3), "softmax", activation="sigmoid"))
+    return models
+
+
+def test_mean_matches_members():
+
+    models = make_models((1, 4))
+    x = np.random.RandomState(1).randn(10, 4)
+
+    ensemble = en.Ensemble(models, max_batch=16)
+
+    np.testing.assert_allclose(ensemble.predict(x), np.mean([model.predict(x) for model in models], axis=0))
+
+def test_vote_per_input_spanning_rows():
+
+    #inputs of 2 rows get one vote per member, placed at the member's largest output over both rows
+    models = make_models((2, 4))
+    x = np.random.RandomState(1).randn(10, 4)
+
+    ensemble = en.Ensemble(models, reduction="vote", max_batch=8)
+    votes = ensemble.predict(x).reshape(5, -1)
+
+    expected = np.zeros((5, 6))
+    for model in models:
+        expected[np.arange(5), np.argmax(model.predict(x).reshape(5, -1), axis=1)] += 1 / len(models)
+
+    np.testing.assert_allclose(votes, expected)
+    np.testing.assert_allclose(votes.sum(axis=1), 1)
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+from seadiver import model as sd
+
+
+def make_model(structure=(16, 3), seed=0, **kwargs):
+    np.random.seed(seed)
+    return sd.ANN((1, 8), structure, "softmax", activation="sigmoid", **kwargs)
+
+
+def test_train_epochs_without_batch_size(data):
+
+    #every epoch is one full-batch step
+    x, t = data
+    model = make_model()
+
+    model.train(x, t, 0.1, epochs=3, save_log=True, display=False)
+
+    assert model.optimizer.step_count == 3
+    assert len(model.error_log) == 3
+
+def test_workspace_and_recompute_match_plain_training(data):
+
+    #the buffers a session keeps change memory use only, never the trained weights
+    x, t = data
+    weights = []
+
+    for options in [dict(workspace=True), dict(workspace=False), dict(workspace=False, recompute=1), dict(workspace=False, recompute=2)]:
+        model = make_model((8, 8, 8, 3))
+        np.random.seed(1)
+        model.train(x, t, 0.05, batch_size=16, epochs=3, display=False, **options)
+        weights.append(model.w_layers)
+
+    for other in weights[1:]:
+        for w, w_other in zip(weights[0], other):
+            np.testing.assert_array_equal(w, w_other)
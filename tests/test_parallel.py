@@ -0,0 +1,32 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import pytest
+
+from seadiver import model as sd
+
+
+def make_model():
+    np.random.seed(0)
+    return sd.ANN((1, 8), (16, 3), "softmax", activation="sigmoid")
+
+
+@pytest.mark.parametrize("options", [dict(batch_size=16, epochs=2), dict(iteration=4)])
+def test_data_parallel_matches_single_process(data, options):
+
+    #workers differ from one process only in the order gradients are summed
+    #plain SGD, Adam would rescale the rounding noise of the softmax layer's bias gradient, whose terms cancel to ~1e-17
+    x, t = data
+    models = [make_model(), make_model()]
+
+    for model, n_workers in zip(models, (None, 2)):
+        np.random.seed(1)
+        model.train(x, t, 0.1, display=False, n_workers=n_workers, **options)
+
+    assert models[1].optimizer.step_count == models[0].optimizer.step_count
+
+    for w, w_parallel in zip(models[0].w_layers, models[1].w_layers):
+        np.testing.assert_allclose(w, w_parallel, rtol=1e-10, atol=1e-12)
+    np.testing.assert_allclose(models[0].b_layers, models[1].b_layers, rtol=1e-10, atol=1e-12)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import pytest
+
+from seadiver import dataset
+from seadiver import model as sd
+
+
+def make_model(input_shape=(2, 4)):
+
+    #softmax over inputs of several rows, so chunks must never split an input
+    np.random.seed(0)
+    return sd.ANN(input_shape, (8, 3), "softmax", activation="sigmoid")
+
+
+@pytest.mark.parametrize("chunk_size, n_threads", [(1, 1), (3, 1), (7, 1), (3, 2), (4, 3), (1000, 2)])
+def test_chunked_predict_matches_predict(chunk_size, n_threads):
+
+    model = make_model()
+    x = np.random.RandomState(1).randn(50, 4)
+
+    expected = model.predict(x)
+
+    np.testing.assert_array_equal(model.predict(x, chunk_size=chunk_size, n_threads=n_threads), expected)
+
+    out = np.empty_like(expected)
+    assert model.predict(x, chunk_size=chunk_size, n_threads=n_threads, out=out) is out
+    np.testing.assert_array_equal(out, expected)
+
+def test_chunked_predict_of_a_dataset(tmp_path):
+
+    model = make_model()
+    x = np.random.RandomState(1).randn(50, 4)
+    np.save(tmp_path / "x.npy", x)
+
+    np.testing.assert_array_equal(model.predict(dataset.load(str(tmp_path / "x.npy")), chunk_size=4), model.predict(x))
+
+def test_chunked_predict_of_a_single_input():
+
+    model = make_model((1, 4))
+    x = np.random.RandomState(1).randn(4)
+
+    np.testing.assert_array_equal(model.predict(x, chunk_size=8), model.predict(x))
+    np.testing.assert_array_equal(model.predict(x, n_threads=2), model.predict(x))
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import pytest
+
+from seadiver import model as sd
+
+
+def trained_model(data):
+
+    #answers the model can learn, so its outputs are far from uniform
+    x, _ = data
+    t = np.eye(3)[np.argmax(x[:, :3], axis=1)]
+
+    np.random.seed(0)
+    model = sd.ANN((1, 8), (32, 32, 3), "softmax", activation="sigmoid")
+    model.train(x, t, 0.01, batch_size=16, epochs=50, optimizer="adam", display=False)
+
+    return model
+
+
+@pytest.mark.parametrize("per_channel", [True, False])
+def test_accuracy_report_is_bounded(data, per_channel):
+
+    x, _ = data
+    model = trained_model(data)
+
+    plan = model.quantize(x, per_channel=per_channel)
+
+    assert 0 < plan.accuracy["max_abs_error"] < 0.02
+    assert plan.accuracy["relative_error"] < 0.01
+    assert plan.accuracy["argmax_agreement"] >= 0.95
+    np.testing.assert_allclose(plan.predict(x), model.predict(x), atol=0.02)
+
+def test_nbytes_is_the_memory_footprint(data):
+
+    x, _ = data
+    plan = trained_model(data).quantize(x)
+
+    assert plan.nbytes() == sum(w.nbytes for w in plan.w_layers) + sum(scale.nbytes for scale in plan.w_scales)
+    assert all(w.dtype == np.float32 for w in plan.w_layers)
+
+def test_quantized_export_round_trip(tmp_path, data):
+
+    x, _ = data
+    model = trained_model(data)
+    plan = model.quantize(x)
+    expected = plan.predict(x).copy()
+
+    model.export_binary(str(tmp_path), "model.sdv", include="quantized")
+    model.export(str(tmp_path), "model.json", include="quantized")
+
+    #'export' joins with a backslash
+    for path in (str(tmp_path / "model.sdv"), str(tmp_path) + "\\" + "model.json"):
+        loaded = sd.make(path)
+        for q, q_loaded in zip(plan.q_layers(), loaded.quantized.q_layers()):
+            np.testing.assert_array_equal(q, q_loaded)
+        np.testing.assert_array_equal(loaded.quantized.predict(x), expected)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import asyncio
+
+import pytest
+
+from seadiver import model as sd
+from seadiver import serving
+
+
+def make_model():
+    np.random.seed(0)
+    return sd.ANN((1, 4), (8, 3), "softmax", activation="sigmoid")
+
+def recording(predict, sizes):
+
+    #a predictor recording the number of rows of every batch
+    def run(x):
+        sizes.append(x.shape[0])
+        return predict(x)
+
+    return run
+
+
+def test_batches_never_exceed_max_batch_size():
+
+    model = make_model()
+    x = np.random.RandomState(1).randn(35, 4)
+    sizes = []
+
+    async def session():
+        async with serving.BatchingPredictor(recording(model.predict, sizes), max_batch_size=8, max_wait_us=100000) as server:
+            requests = [server.predict(x[i:i+3]) for i in range(0, 15, 3)]
+            return await asyncio.gather(*requests, server.predict(x[15:]))
+
+    outputs = asyncio.run(session())
+
+    assert max(sizes) <= 8
+    assert sum(sizes) == 35
+    np.testing.assert_allclose(np.concatenate(outputs), model.predict(x))
+
+def test_malformed_request_is_rejected():
+
+    model = make_model()
+    x = np.random.RandomState(1).randn(6, 4)
+
+    async def session():
+        async with serving.BatchingPredictor(model, max_batch_size=8, max_wait_us=100000) as server:
+            return await asyncio.gather(server.predict(x[:3]), server.predict(np.ones((2, 5))), server.predict(np.ones((2, 2, 4))), server.predict(x[3:]), return_exceptions=True)
+
+    first, wide, deep, last = asyncio.run(session())
+
+    assert isinstance(wide, Exception)
+    assert isinstance(deep, Exception)
+    np.testing.assert_allclose(first, model.predict(x[:3]))
+    np.testing.assert_allclose(last, model.predict(x[3:]))
+
+def test_failed_request_only_fails_its_own_future():
+
+    model = make_model()
+    x = np.random.RandomState(1).randn(6, 4)
+    sizes = []
+
+    #a callable has no input shape, so the bad request reaches the batch
+    async def session():
+        async with serving.BatchingPredictor(recording(model.predict, sizes), max_batch_size=8, max_wait_us=100000) as server:
+            return await asyncio.gather(server.predict(x[:3]), server.predict(np.ones((2, 5))), server.predict(x[3:]), return_exceptions=True)
+
+    first, wide, last = asyncio.run(session())
+
+    assert isinstance(wide, Exception)
+    np.testing.assert_allclose(first, model.predict(x[:3]))
+    np.testing.assert_allclose(last, model.predict(x[3:]))
+
+def test_predict_requires_start():
+
+    server = serving.BatchingPredictor(make_model())
+
+    with pytest.raises(Exception):
+        asyncio.run(server.predict(np.ones((1, 4))))
+
+def test_requests_made_while_stopping_are_rejected():
+
+    model = make_model()
+    x = np.random.RandomState(1).randn(6, 4)
+
+    async def session():
+
+        server = serving.BatchingPredictor(model, max_batch_size=8, max_wait_us=1000)
+        await server.start()
+
+        first = asyncio.ensure_future(server.predict(x[:3]))
+        await asyncio.sleep(0)
+
+        stopping = asyncio.ensure_future(server.stop())
+        await asyncio.sleep(0)
+
+        #a late request must fail rather than wait behind the stop forever
+        with pytest.raises(Exception, match="stopping"):
+            await asyncio.wait_for(server.predict(x[3:]), 1)
+
+        await asyncio.wait_for(stopping, 1)
+
+        return await first
+
+    np.testing.assert_allclose(asyncio.run(session()), model.predict(x[:3]))
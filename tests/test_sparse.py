@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+import numpy as np
+
+import pytest
+
+from seadiver import model as sd
+
+sparse = pytest.importorskip("scipy.sparse")
+
+
+def make_model():
+    np.random.seed(0)
+    return sd.ANN((1, 8), (16, 3), "softmax", activation="sigmoid")
+
+def sparse_data(data):
+
+    #about two thirds of the inputs are zero
+    x, t = data
+    x = np.where(np.abs(x) > 1, x, 0)
+    return x, t
+
+
+@pytest.mark.parametrize("layout", [sparse.csr_matrix, sparse.csc_matrix, sparse.coo_matrix])
+@pytest.mark.parametrize("options", [dict(batch_size=8, epochs=2), dict(iteration=5)])
+def test_sparse_training_matches_dense(data, layout, options):
+
+    x, t = sparse_data(data)
+    models = [make_model(), make_model()]
+
+    for model, inputs in zip(models, (x, layout(x))):
+        np.random.seed(1)
+        model.train(inputs, t, 0.1, display=False, **options)
+
+    for w, w_sparse in zip(models[0].w_layers, models[1].w_layers):
+        np.testing.assert_allclose(w, w_sparse, rtol=1e-12, atol=1e-14)
+
+@pytest.mark.parametrize("layout", [sparse.csr_matrix, sparse.coo_matrix])
+def test_sparse_predict_matches_dense(data, layout):
+
+    x, t = sparse_data(data)
+    model = make_model()
+
+    expected = model.predict(x)
+
+    np.testing.assert_allclose(model.predict(layout(x)), expected, rtol=1e-12, atol=1e-14)
+    np.testing.assert_allclose(model.predict(layout(x), chunk_size=10), expected, rtol=1e-12, atol=1e-14)
+    np.testing.assert_allclose(model.evaluate(layout(x), t), model.evaluate(x, t), rtol=1e-12)